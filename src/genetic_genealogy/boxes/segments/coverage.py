@@ -0,0 +1,78 @@
+from typing import Iterator
+
+from genetic_genealogy.boxes.segments.segment_loader import load_segment_store
+from genetic_genealogy.boxes.segments.segment_store import SegmentStore
+from genetic_genealogy.boxes.segments.sweep import merge_segments_of_people
+from genetic_genealogy.csv_io import CSVHelper
+from genetic_genealogy.parsers.formats import CoverageFormatEnum
+
+
+class CoverageFinder:
+	"""Finds how many matches cover the regions of chromosomes.
+	Regions covered by segments of many matches are pile-up regions."""
+
+	def __init__(self):
+		self._segments = SegmentStore()
+
+	__output_format = CoverageFormatEnum
+
+	def load_segments(self, segments_filename=None, from_database=False) -> None:
+		"""Loads segments from CSV file. If filename is not specified, segments are read from standard input.
+		If from_database is True, segment database specified in project configuration is used."""
+		self._segments = load_segment_store(segments_filename, from_database)
+
+	def save_coverage(self, result, output_filename=None) -> None:
+		"""Saves the coverage to file or to standard output if output_filename is None.
+		The result can be any iterable of rows, rows are written as they are produced."""
+		CSVHelper.save_csv(result, self.__output_format, output_filename)
+
+	def find_coverage(self, min_depth=1) -> Iterator:
+		"""Finds the coverage of all chromosomes, yields one row for each region covered
+		by segments of the same number of matches (the depth). Only regions with depth
+		of at least min_depth are yielded. Neighbouring regions always differ in depth.
+
+		Segments of every match are first merged, so that every match is counted only once.
+		Then the depth is computed by a single cumulative sum over the sorted breakpoints, not by comparing
+		pairs of segments. Runs in O(n log n)."""
+		of = self.__output_format
+
+		for chrom_id, (begin, end) in self._segments.chromosome_offsets.items():
+			for start, stop, depth in self.__find_chromosome_coverage(begin, end):
+				if depth < min_depth:
+					continue
+
+				row = ['' for _ in of]
+				row[of.chromosome_id] = chrom_id
+				row[of.start] = start
+				row[of.end] = stop
+				row[of.depth] = depth
+
+				yield row
+
+	def __find_chromosome_coverage(self, begin, end) -> Iterator:
+		"""Yields (start, end, depth) tuples of all the regions on the block of store
+		given by begin and end (one chromosome), where depth is not 0."""
+
+		# depth changes on breakpoints, +1 on the start of a segment, -1 after its end
+		changes = {}
+
+		store = self._segments
+		merged = merge_segments_of_people(
+			store.starts[begin:end],
+			store.ends[begin:end],
+			store.person_ids[begin:end]
+		)
+
+		for _, start, stop in merged:
+			changes[start] = changes.get(start, 0) + 1
+			changes[stop + 1] = changes.get(stop + 1, 0) - 1
+
+		# breakpoints, where the changes cancel out, do not split regions
+		breakpoints = sorted(position for position, change in changes.items() if change != 0)
+
+		depth = 0
+		for position, next_position in zip(breakpoints, breakpoints[1:]):
+			depth += changes[position]
+
+			if depth != 0:
+				yield position, next_position - 1, depth
@@ -1,9 +1,14 @@
 from abc import ABC, abstractmethod
-
-from genetic_genealogy.project.config_helper import ConfigHelper
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator
+
+from genetic_genealogy.boxes.segments.interval_index import IntervalIndex
+from genetic_genealogy.boxes.segments.segment_loader import load_segment_store
+from genetic_genealogy.boxes.segments.segment_store import SegmentStore
+from genetic_genealogy.boxes.segments.sweep import sweep_intersections, sweep_intersections_to_arrays, \
+	intersection_weight, triangulation_groups
 from genetic_genealogy.csv_io import CSVHelper
-from genetic_genealogy.exit_codes import ExitCodes
-from genetic_genealogy.parsers.formats import SegmentIntersectionFormatEnum, SegmentFormatEnum
+from genetic_genealogy.parsers.formats import SegmentIntersectionFormatEnum, TriangulationGroupFormatEnum
 
 
 class IntersectionFinder(ABC):
@@ -14,204 +19,312 @@ class IntersectionFinder(ABC):
 
 	@abstractmethod
 	def save_intersections(self, result, output_destination) -> None:
-		"""Saves found segments to the output_destination."""
+		"""Saves found segments to the output_destination.
+		The result can be any iterable of rows, it is consumed lazily."""
 		pass
 
 	@abstractmethod
-	def find_intersections_of_segment(self, segment_id) -> list:
+	def find_intersections_of_segment(self, segment_id) -> Iterator:
 		"""Finds all segments that intersect a specified segment,
-		finds the intersection start- and end-points."""
+		finds the intersection start- and end-points.
+		Yields the output rows one by one."""
+
+	@abstractmethod
+	def find_intersections_of_person(self, person_id) -> Iterator:
+		"""Finds all intersections of all segments shared with a given person.
+		Yields the output rows one by one."""
+
+	@abstractmethod
+	def find_intersections_of_segments(self, segment_ids) -> Iterator:
+		"""Finds all intersections of all the specified segments.
+		Every intersecting pair of segments is found only once, even if both segments are specified.
+		Yields the output rows one by one."""
 
 	@abstractmethod
-	def find_intersections_of_person(self, person_id) -> list:
-		"""Finds all intersections of all segments shared with a given person."""
+	def find_intersections_of_people(self, person_ids) -> Iterator:
+		"""Finds all intersections of all segments shared with any of the given people.
+		Every intersecting pair of segments is found only once.
+		Yields the output rows one by one."""
 
 	@abstractmethod
-	def find_all_intersections(self) -> list:
-		"""Finds all intersections of all segments loaded."""
+	def find_new_intersections(self, processed_segment_id) -> Iterator:
+		"""Finds all intersections of segments with ids larger than processed_segment_id,
+		intersections of the older segments with each other are not found.
+		Yields the output rows one by one."""
+
+	@abstractmethod
+	def get_largest_segment_id(self) -> int:
+		"""Returns the largest id of all segments loaded, 0 if there are no segments."""
+
+	@abstractmethod
+	def find_all_intersections(self, jobs=1) -> Iterator:
+		"""Finds all intersections of all segments loaded.
+		Chromosomes can be processed in parallel by the given number of jobs.
+		Yields the output rows one by one."""
+
+	@abstractmethod
+	def save_triangulation_groups(self, result, output_destination) -> None:
+		"""Saves found triangulation groups to the output_destination.
+		The result can be any iterable of rows, it is consumed lazily."""
+
+	@abstractmethod
+	def find_triangulation_groups(self, min_size=3) -> Iterator:
+		"""Finds all triangulation groups - maximal sets of at least min_size matches,
+		whose segments all overlap a common region on a chromosome.
+		Yields the output rows one by one."""
 
 
 class CSVIntersectionFinder(IntersectionFinder):
-	def __init__(self):
+	def __init__(self, min_overlap=0, min_cm=0, min_snps=0):
+		"""Only intersections at least min_overlap base pairs long and with at least min_cm centimorgans
+		and min_snps SNPs will be found. Centimorgans and SNPs within an intersection are estimated
+		from the values of the shorter of the intersecting segments."""
 		super(CSVIntersectionFinder, self).__init__()
-		self._segments = []
+		self._segments = SegmentStore()
 
-		self._segments_by_int_id = {}
-		self._segments_by_chromosome = {}
+		self._min_overlap = min_overlap
+		self._min_cm = min_cm
+		self._min_snps = min_snps
+
+		# interval indexes are created lazily, only when they are needed
+		self._intervals_by_chromosome = {}
 
-	__segment_format = SegmentFormatEnum
 	__output_format = SegmentIntersectionFormatEnum
 
-	def load_segments(self, segments_filename=None, from_database=False):
+	def load_segments(self, segments_filename=None, from_database=False, mapped=False, segment_ids=None):
 		"""
 		Loads segments. Intersections of these loaded segments will later be found.
 
 		Loads segments from CSV file. If filename is not specified, segment database specified in
 		project configuration is used.
-		Build a dictionary of segments over ids and over chromosomes."""
+		The segment database is loaded from its binary index file, if the index is up to date.
+		Otherwise, the csv database is loaded and the index is created again.
+		If mapped is True, the index file is only memory mapped, which is faster when looking up few segments.
+		If segment_ids are given, only the intersections of these segments will be found,
+		so only the shards of their chromosomes are loaded from the sharded segment database."""
 
-		if from_database:
-			segments_filename = ConfigHelper.get_segment_database_location()
+		self._segments = load_segment_store(segments_filename, from_database, mapped, segment_ids)
+		self._intervals_by_chromosome = {}
 
-		try:
-			self._segments = CSVHelper.load_csv(segments_filename, self.__segment_format)
+	def save_intersections(self, result, output_filename=None):
+		"""Saves the found intersections to file or to standard output if output_filename is None.
+		The result can be any iterable of rows, rows are written as they are produced."""
 
-		except FileNotFoundError:
-			print("The source file was not found.")
-			exit(ExitCodes.no_such_file)
-		except IOError:
-			print("The source file could not be loaded.")
-			exit(ExitCodes.io_error)
+		CSVHelper.save_csv(result, SegmentIntersectionFormatEnum, output_filename)
 
-		self._create_segments_by_id()
-		self._create_segments_by_chromosome()
+	def append_intersections(self, result, output_filename) -> None:
+		"""Appends the found intersections to the end of the file with previously found intersections."""
 
-	def save_intersections(self, result, output_filename=None):
-		"""Saves the found intersections to file or to standard output if output_filename is None."""
+		CSVHelper.append_csv(result, SegmentIntersectionFormatEnum, output_filename)
 
-		CSVHelper.save_csv(result, SegmentIntersectionFormatEnum, output_filename)
+	def save_triangulation_groups(self, result, output_filename=None) -> None:
+		"""Saves the found triangulation groups to file or to standard output if output_filename is None.
+		The result can be any iterable of rows, rows are written as they are produced."""
+
+		CSVHelper.save_csv(result, TriangulationGroupFormatEnum, output_filename)
 
-	def _create_segments_by_id(self) -> None:
-		for segment in self._segments:
-			# create a dict where ids are keys
-			self._segments_by_int_id[int(segment[self.__segment_format.segment_id])] = segment
-
-	def _create_segments_by_chromosome(self) -> None:
-		# create a dict where chromosome ids are keys and values are lists of segments
-		# will be used for faster computation
-		for segment in self._segments:
-			chrom_id = segment[self.__segment_format.chromosome_id]
-			if chrom_id in self._segments_by_chromosome.keys():
-				self._segments_by_chromosome[chrom_id].append(segment)
-			else:
-				self._segments_by_chromosome[chrom_id] = [segment]
-
-	def find_intersections_of_segment(self, segment_id) -> list:
+	def _get_intervals(self, chrom_id) -> IntervalIndex:
+		"""Returns the interval index of the given chromosome, creates it when it is needed for the first time.
+		Values in the index are positions of the segments in the store."""
+		if chrom_id not in self._intervals_by_chromosome.keys():
+			begin, end = self._segments.chromosome_offsets[chrom_id]
+			self._intervals_by_chromosome[chrom_id] = IntervalIndex(
+				self._segments.starts[begin:end],
+				self._segments.ends[begin:end],
+				range(begin, end),
+				self._segments.get_max_ends(chrom_id)
+			)
+
+		return self._intervals_by_chromosome[chrom_id]
+
+	def find_intersections_of_segment(self, segment_id) -> Iterator:
 		"""Finds all segments that intersect a specified segment,
-		finds the intersection start- and end-points."""
+		finds the intersection start- and end-points.
+		Yields the output rows one by one."""
+		return self.find_intersections_of_segments([segment_id])
 
-		if int(segment_id) not in self._segments_by_int_id.keys():
-			# if segment is not known, cannot find anything
-			return []
+	def find_intersections_of_person(self, person_id) -> Iterator:
+		"""Finds all intersections of all segments shared with a given person.
+		Yields the output rows one by one."""
+		return self.find_intersections_of_people([person_id])
 
-		sf = self.__segment_format
+	def find_intersections_of_segments(self, segment_ids) -> Iterator:
+		"""Finds all intersections of all the specified segments.
+		Every intersecting pair of segments is found only once, even if both segments are specified.
+		Yields the output rows one by one."""
 
-		segment = self._segments_by_int_id[int(segment_id)]
-		chromosome_id = segment[sf.chromosome_id]
-		if chromosome_id not in self._segments_by_chromosome.keys():
-			return []
+		store = self._segments
 
-		result = []
-		chromosome = self._segments_by_chromosome[chromosome_id]
+		# ids of segments, whose intersections were already found,
+		# their pairs with the later segments were already found too
+		done_ids = set()
+
+		for segment_id in segment_ids:
+			segment_id = int(segment_id)
+			segment = store.get_position(segment_id)
 
-		for s in chromosome:
-			# for every other segment on the same chromosome
-			if int(s[sf.segment_id]) == int(segment_id):
-				# it is the same segment, skip it
+			if segment_id in done_ids or segment is None:
+				# if segment was already processed or is not known, there is nothing to find
 				continue
 
-			intersection = self.__check_and_get_intersection(s, segment)
+			chrom_id = store.get_chromosome(segment)
+			start = store.starts[segment]
+			end = store.ends[segment]
 
-			if intersection is not None:
-				output_row = self.__create_and_fill_output_row(s, segment, intersection)
-				result.append(output_row)
+			# only the overlapping segments are found, sorting them keeps the order of the store
+			for position in sorted(self._get_intervals(chrom_id).find_overlapping(start, end)):
+				other_id = store.segment_ids[position]
 
-		return result
+				if other_id == segment_id or other_id in done_ids:
+					# it is the same segment or the pair was already found, skip it
+					continue
 
-	def find_intersections_of_person(self, person_id) -> list:
-		"""Finds all intersections of all segments shared with a given person."""
-		result = []
-		for segment in self.__get_segments_of_person(person_id):
-			result.extend(self.find_intersections_of_segment(segment[self.__segment_format.segment_id]))
+				intersection = (max(start, store.starts[position]), min(end, store.ends[position]))
 
-		return result
+				if not self.__passes_thresholds(position, segment, intersection):
+					continue
 
-	def __get_segments_of_person(self, person_id) -> list:
-		result = []
+				yield self.__create_and_fill_output_row(position, segment, intersection)
 
-		for segment in self._segments:
-			if int(segment[self.__segment_format.person_id]) == int(person_id):
-				result.append(segment)
+			done_ids.add(segment_id)
 
-		return result
+	def find_intersections_of_people(self, person_ids) -> Iterator:
+		"""Finds all intersections of all segments shared with any of the given people.
+		Every intersecting pair of segments is found only once.
+		Yields the output rows one by one."""
 
-	def find_all_intersections(self) -> list:
-		"""Finds all intersections of all segments loaded."""
-		sf = self.__segment_format
-		result = []
+		store = self._segments
+		segment_ids = (
+			store.segment_ids[position]
+			for person_id in person_ids
+			for position in store.get_positions_of_person(int(person_id))
+		)
 
-		for chrom_id in self._segments_by_chromosome:
-			chromosome = self._segments_by_chromosome[chrom_id]
+		return self.find_intersections_of_segments(segment_ids)
 
-			# sort all segments on one chromosome by start
-			chromosome.sort(key=lambda x: int(x[self.__segment_format.start]))
+	def find_new_intersections(self, processed_segment_id) -> Iterator:
+		"""Finds all intersections of segments with ids larger than processed_segment_id,
+		intersections of the older segments with each other are not found.
+		The new segments are looked up in the interval index, so only the new segments are processed.
+		Yields the output rows one by one."""
+		new_ids = sorted(segment_id for segment_id in self._segments.segment_ids if segment_id > processed_segment_id)
 
-			# go from the start and keep track of which segments have not yet ended
-			open_segments = []
-			for segment in chromosome:
-				current_position = segment[self.__segment_format.start]
+		return self.find_intersections_of_segments(new_ids)
 
-				for o in open_segments:
-					if int(o[sf.end]) < int(current_position):
-						# close ended segment
-						open_segments.remove(o)
-						continue
+	def get_largest_segment_id(self) -> int:
+		"""Returns the largest id of all segments loaded, 0 if there are no segments."""
+		return max(self._segments.segment_ids, default=0)
 
-					# if segment has not ended yet, there is an intersection
-					intersection = self.__check_and_get_intersection(segment, o)
+	def find_all_intersections(self, jobs=1) -> Iterator:
+		"""Finds all intersections of all segments loaded.
+		Uses a sweep over the segments of every chromosome sorted by start.
+		If jobs is greater than 1, chromosomes are swept in parallel by a pool of that many processes.
 
-					output_row = self.__create_and_fill_output_row(segment, o, intersection)
-					result.append(output_row)
+		Yields the output rows one by one, so only the open segments of the sweep are kept in memory.
+		When using more jobs, the intersections of whole chromosomes are kept as compact int arrays."""
 
-				# open_segments current segment
-				open_segments.append(segment)
+		for begin, intersections in self.__sweep_chromosomes(jobs):
+			for i, j, start, end in intersections:
+				yield self.__create_and_fill_output_row(begin + i, begin + j, (start, end))
 
-		return result
+	def find_triangulation_groups(self, min_size=3) -> Iterator:
+		"""Finds all triangulation groups - maximal sets of at least min_size matches,
+		whose segments all overlap a common region on a chromosome.
+		Every chromosome is processed by a single sweep over the sorted breakpoints,
+		pairs of intersecting segments are never enumerated.
+		Yields the output rows one by one, ordered by chromosome and the common region."""
 
-	@staticmethod
-	def __check_and_get_intersection(segment_s, segment_r):
-		"""Checks if the two given segments intersect.
-		If yes, it returns the start and the end of the intersecting region as a tuple."""
-		sf = CSVIntersectionFinder.__segment_format
-		coords = [
-			(
-				(segment_s[sf.start], segment_s[sf.end]),
-				(segment_r[sf.start], segment_r[sf.end])
-			),
-			(
-				(segment_r[sf.start], segment_r[sf.end]),
-				(segment_s[sf.start], segment_s[sf.end])
+		store = self._segments
+		of = TriangulationGroupFormatEnum
+
+		for chrom_id, (begin, end) in store.chromosome_offsets.items():
+			groups = triangulation_groups(
+				store.starts[begin:end],
+				store.ends[begin:end],
+				store.person_ids[begin:end],
+				min_size
 			)
-		]
 
-		for cs in coords:
-			s_s = int(cs[0][0])
-			s_e = int(cs[0][1])
-			r_s = int(cs[1][0])
-			r_e = int(cs[1][1])
+			for start, stop, person_ids in groups:
+				row = ['' for _ in of]
+				row[of.chromosome_id] = chrom_id
+				row[of.start] = start
+				row[of.end] = stop
+				row[of.person_count] = len(person_ids)
+				row[of.person_ids] = " ".join(str(person_id) for person_id in person_ids)
+
+				yield row
+
+	def __sweep_chromosomes(self, jobs):
+		"""Yields the first positions of the chromosomes in the store together with iterables of intersections
+		found on them by the sweep. Chromosomes are always yielded in the same order, regardless of jobs."""
+		store = self._segments
+		blocks = list(store.chromosome_offsets.values())
+
+		if jobs <= 1:
+			for begin, end in blocks:
+				yield begin, sweep_intersections(
+					store.starts[begin:end],
+					store.ends[begin:end],
+					self._min_overlap,
+					self.__get_weight_thresholds(begin, end)
+				)
+			return
+
+		# the workers only get compact arrays of numbers
+		starts = [store.starts[begin:end] for begin, end in blocks]
+		ends = [store.ends[begin:end] for begin, end in blocks]
+		min_overlaps = [self._min_overlap] * len(blocks)
+		weight_thresholds = [self.__get_weight_thresholds(begin, end) for begin, end in blocks]
+
+		with ProcessPoolExecutor(max_workers=jobs) as executor:
+			# map returns the results in the order of the chromosomes
+			found = executor.map(sweep_intersections_to_arrays, starts, ends, min_overlaps, weight_thresholds)
+
+			for (begin, _), columns in zip(blocks, found):
+				yield begin, zip(*columns)
+
+	def __get_weight_thresholds(self, begin, end) -> list:
+		"""Returns a list of (weights, minimum) pairs for the centimorgan and SNP thresholds that are set,
+		weights are taken from the given block of the store."""
+		result = []
+		for weights, minimum in [(self._segments.lengths_cm, self._min_cm), (self._segments.snps, self._min_snps)]:
+			if minimum > 0:
+				result.append((weights[begin:end], minimum))
+
+		return result
+
+	def __passes_thresholds(self, position_s, position_r, intersection) -> bool:
+		"""Checks if the intersection of the two segments on the given positions in the store is large enough."""
+		store = self._segments
+		length = intersection[1] - intersection[0] + 1
+
+		if length < self._min_overlap:
+			return False
 
-			if s_s <= r_s <= s_e:
-				if r_e <= s_e:
-					return r_s, r_e
-				else:
-					return r_s, s_e
+		length_s = store.ends[position_s] - store.starts[position_s] + 1
+		length_r = store.ends[position_r] - store.starts[position_r] + 1
 
-			if s_s <= r_e <= s_e:
-				return s_s, r_e
+		for weights, minimum in [(store.lengths_cm, self._min_cm), (store.snps, self._min_snps)]:
+			if minimum > 0 and intersection_weight(
+					weights[position_s], length_s,
+					weights[position_r], length_r,
+					length) < minimum:
+				return False
 
-		return None
+		return True
 
-	def __create_and_fill_output_row(self, s1, s2, intersection) -> list:
-		sf = self.__segment_format
+	def __create_and_fill_output_row(self, position_1, position_2, intersection) -> list:
+		"""Creates an output row for the intersection of the segments on the given positions in the store."""
 		of = self.__output_format
 
 		row = ['' for _ in of]
 
-		row[of.person_id_1] = s1[sf.person_id]
-		row[of.person_id_2] = s2[sf.person_id]
+		row[of.person_id_1] = self._segments.person_ids[position_1]
+		row[of.person_id_2] = self._segments.person_ids[position_2]
 
-		row[of.segment_1_id] = s1[sf.segment_id]
-		row[of.segment_2_id] = s2[sf.segment_id]
+		row[of.segment_1_id] = self._segments.segment_ids[position_1]
+		row[of.segment_2_id] = self._segments.segment_ids[position_2]
 
 		row[of.start] = intersection[0]
 		row[of.end] = intersection[1]
@@ -0,0 +1,104 @@
+class IntervalIndex:
+	"""Index of intervals (segments) on one chromosome used for fast overlap queries.
+
+	Intervals are kept sorted by start. An implicit augmented binary tree
+	is laid over the sorted list: the node on index i is on the level given by the number
+	of trailing ones of i, and every node stores the maximal end within its subtree.
+	Overlap queries then run in O(log n + k), where k is the number of intervals found.
+	Both start and end coordinates are inclusive."""
+
+	# subtrees of this level or lower are scanned linearly
+	__linear_scan_level = 3
+
+	def __init__(self, starts, ends, values, max_ends=None):
+		"""Builds the index from sequences of int starts and ends of intervals already sorted by start.
+		For every interval, the corresponding item in values is returned by queries.
+		The maximal subtree ends of an index built before can be given as max_ends, then they are not computed again."""
+
+		self.starts = starts
+		self.ends = ends
+		self.values = values
+
+		if max_ends is None:
+			self.max_ends = list(self.ends)
+			self.__build()
+		else:
+			self.max_ends = max_ends
+
+		# the root is on the highest level, whose node fits into the list
+		self._max_level = len(self.starts).bit_length() - 1
+
+	def __len__(self):
+		return len(self.starts)
+
+	def __build(self) -> None:
+		"""Fills the maximal subtree ends of all the nodes."""
+		n = len(self.starts)
+		if n == 0:
+			return
+
+		max_ends = self.max_ends
+
+		# the last leaf and the maximal end under the last node on the current level
+		last_index = (n - 1) & ~1
+		last = max_ends[last_index]
+
+		level = 1
+		while 1 << level <= n:
+			half = 1 << (level - 1)
+
+			for i in range((half << 1) - 1, n, half << 2):
+				left = max_ends[i - half]
+				right = max_ends[i + half] if i + half < n else last
+				max_ends[i] = max(max_ends[i], left, right)
+
+			# move to the parent of the last node
+			last_index = last_index - half if (last_index >> level) & 1 else last_index + half
+			if last_index < n and max_ends[last_index] > last:
+				last = max_ends[last_index]
+
+			level += 1
+
+	def find_overlapping(self, start, end) -> list:
+		"""Returns values of all the intervals overlapping the interval from start to end.
+		The values are not returned in any particular order."""
+		n = len(self.starts)
+		starts = self.starts
+		ends = self.ends
+		max_ends = self.max_ends
+
+		result = []
+		if n == 0:
+			return result
+
+		# stack of (level, node index, is left child already processed)
+		stack = [(self._max_level, (1 << self._max_level) - 1, False)]
+
+		while stack:
+			level, node, left_done = stack.pop()
+
+			if level <= self.__linear_scan_level:
+				# small subtree, scan it linearly
+				i = node >> level << level
+				last = min(i + (1 << (level + 1)) - 1, n)
+
+				while i < last and starts[i] <= end:
+					if ends[i] >= start:
+						result.append(self.values[i])
+					i += 1
+
+			elif not left_done:
+				stack.append((level, node, True))
+
+				# the left child may be out of range, its subtree can still contain intervals
+				left = node - (1 << (level - 1))
+				if left >= n or max_ends[left] >= start:
+					stack.append((level - 1, left, False))
+
+			elif node < n and starts[node] <= end:
+				if ends[node] >= start:
+					result.append(self.values[node])
+
+				stack.append((level - 1, node + (1 << (level - 1)), False))
+
+		return result
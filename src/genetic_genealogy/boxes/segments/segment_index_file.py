@@ -0,0 +1,229 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+
+from genetic_genealogy.boxes.segments.interval_index import IntervalIndex
+from genetic_genealogy.boxes.segments.segment_store import SegmentStore
+from genetic_genealogy.csv_io import CSVHelper
+
+
+class SegmentIndexFile:
+	"""Binary file stored next to the csv segment database, holding the database in the form of a SegmentStore.
+
+	The index file is only valid for the version of the csv file it was created from,
+	the version is recognised by the size and the modification time of the csv file.
+	If the csv file changes, the index is considered outdated and must be created again.
+
+	File layout: header, chromosome table (id, begin and end of every chromosome block), padding
+	to 8 bytes and fixed-width tables of 8 byte values, one after another:
+	the raw data of all the SegmentStore columns, maximal subtree ends of the interval indexes of the chromosome blocks,
+	segment ids sorted with the positions of the segments and person ids sorted with the positions of their segments.
+	The tables allow looking segments up without reading the whole file, see MappedSegmentStore."""
+
+	__magic = b"GGSEGIDX"
+	__version = 2
+
+	# magic, version, byte order, csv size, csv modification time, number of chromosomes
+	__header = struct.Struct("<8sI?QqI")
+	# length of chromosome id, begin, end
+	__chromosome = struct.Struct("<HQQ")
+
+	# names of the lookup tables stored after the SegmentStore columns
+	__tables = ["max_ends", "sorted_segment_ids", "segment_positions", "sorted_person_ids", "person_positions"]
+
+	@staticmethod
+	def get_location(source_filename) -> str:
+		"""Returns the location of the index file belonging to the given (possibly compressed) csv file."""
+		return os.path.splitext(CSVHelper.strip_compression(source_filename))[0] + ".idx"
+
+	@staticmethod
+	def load(source_filename):
+		"""Loads the index belonging to the given csv file and returns it as a SegmentStore.
+		If the index does not exist, cannot be read or is outdated, returns None."""
+		try:
+			with open(SegmentIndexFile.get_location(source_filename), 'rb') as index_file:
+				store = SegmentStore()
+				data_offset = SegmentIndexFile.__read_head(index_file, source_filename, store)
+				if data_offset is None:
+					return None
+
+				count = SegmentIndexFile.__get_count(store)
+				if os.fstat(index_file.fileno()).st_size < SegmentIndexFile.__get_size(data_offset, count):
+					# the index is truncated
+					return None
+
+				index_file.seek(data_offset)
+				for name, _ in SegmentStore.columns:
+					getattr(store, name).fromfile(index_file, count)
+
+				return store
+
+		except (IOError, EOFError, struct.error, UnicodeDecodeError):
+			# a missing or broken index is created again
+			return None
+
+	@staticmethod
+	def open(source_filename):
+		"""Memory maps the index belonging to the given csv file and returns it as a MappedSegmentStore.
+		Only the header is read, the segments are read from the disk when they are accessed.
+		If the index does not exist, cannot be read or is outdated, returns None."""
+		try:
+			with open(SegmentIndexFile.get_location(source_filename), 'rb') as index_file:
+				store = MappedSegmentStore()
+				data_offset = SegmentIndexFile.__read_head(index_file, source_filename, store)
+				if data_offset is None:
+					return None
+
+				# the map stays valid after the file is closed
+				index_map = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+			count = SegmentIndexFile.__get_count(store)
+			names = [name for name, _ in SegmentStore.columns] + SegmentIndexFile.__tables
+			if SegmentIndexFile.__get_size(data_offset, count) > len(index_map):
+				# the index is truncated
+				index_map.close()
+				return None
+
+			data = memoryview(index_map)
+			for i, name in enumerate(names):
+				begin = data_offset + i * count * 8
+				typecode = dict(SegmentStore.columns).get(name, 'q')
+				setattr(store, name, data[begin:begin + count * 8].cast(typecode))
+
+			store.index_map = index_map
+			return store
+
+		except (IOError, ValueError, EOFError, struct.error, UnicodeDecodeError):
+			# a missing or broken index is created again
+			return None
+
+	@staticmethod
+	def __read_head(index_file, source_filename, store):
+		"""Reads the header and the chromosome table into the store.
+		Returns the offset of the tables, None if the index is not valid for the source file."""
+		source_stat = os.stat(source_filename)
+
+		magic, version, little_endian, size, mtime, chromosome_count = SegmentIndexFile.__header.unpack(
+			index_file.read(SegmentIndexFile.__header.size))
+
+		if magic != SegmentIndexFile.__magic or version != SegmentIndexFile.__version \
+				or little_endian != (sys.byteorder == "little"):
+			return None
+
+		if size != source_stat.st_size or mtime != source_stat.st_mtime_ns:
+			return None
+
+		for _ in range(chromosome_count):
+			name_length, begin, end = SegmentIndexFile.__chromosome.unpack(
+				index_file.read(SegmentIndexFile.__chromosome.size))
+			chrom_id = index_file.read(name_length).decode("utf-8")
+			store.chromosome_offsets[chrom_id] = (begin, end)
+
+		return SegmentIndexFile.__align(index_file.tell())
+
+	@staticmethod
+	def __get_count(store) -> int:
+		"""Returns the number of segments given by the chromosome table of the store."""
+		return max([end for _, end in store.chromosome_offsets.values()], default=0)
+
+	@staticmethod
+	def __get_size(data_offset, count) -> int:
+		"""Returns the size of the complete index file of count segments, whose tables start on data_offset."""
+		return data_offset + (len(SegmentStore.columns) + len(SegmentIndexFile.__tables)) * count * 8
+
+	@staticmethod
+	def __align(offset) -> int:
+		"""Returns the offset rounded up to a multiple of 8, so that the tables can be mapped as arrays."""
+		return (offset + 7) // 8 * 8
+
+	@staticmethod
+	def save(store: SegmentStore, source_filename, source_stat: os.stat_result) -> None:
+		"""Saves the store as the index of the given csv file.
+		The source_stat must be taken before the csv file was read, so that any later change is detected.
+		The index is first written to a temporary file, so that a broken index is never left behind."""
+		index_filename = SegmentIndexFile.get_location(source_filename)
+		temporary_filename = index_filename + ".tmp"
+
+		with open(temporary_filename, 'wb') as index_file:
+			index_file.write(SegmentIndexFile.__header.pack(
+				SegmentIndexFile.__magic,
+				SegmentIndexFile.__version,
+				sys.byteorder == "little",
+				source_stat.st_size,
+				source_stat.st_mtime_ns,
+				len(store.chromosome_offsets)
+			))
+
+			for chrom_id, (begin, end) in store.chromosome_offsets.items():
+				name = chrom_id.encode("utf-8")
+				index_file.write(SegmentIndexFile.__chromosome.pack(len(name), begin, end))
+				index_file.write(name)
+
+			index_file.write(bytes(SegmentIndexFile.__align(index_file.tell()) - index_file.tell()))
+
+			for name, _ in SegmentStore.columns:
+				getattr(store, name).tofile(index_file)
+
+			for table in SegmentIndexFile.__create_tables(store):
+				table.tofile(index_file)
+
+		os.replace(temporary_filename, index_filename)
+
+	@staticmethod
+	def __create_tables(store: SegmentStore) -> list:
+		"""Creates the lookup tables of the store in the order of __tables."""
+		max_ends = array('q')
+		for begin, end in store.chromosome_offsets.values():
+			max_ends.extend(IntervalIndex(store.starts[begin:end], store.ends[begin:end], range(begin, end)).max_ends)
+
+		# the sort is stable, segments of one person stay in the order of the store
+		segment_positions = array('q', sorted(range(len(store)), key=store.segment_ids.__getitem__))
+		person_positions = array('q', sorted(range(len(store)), key=store.person_ids.__getitem__))
+
+		return [
+			max_ends,
+			array('q', [store.segment_ids[position] for position in segment_positions]),
+			segment_positions,
+			array('q', [store.person_ids[position] for position in person_positions]),
+			person_positions
+		]
+
+
+class MappedSegmentStore(SegmentStore):
+	"""SegmentStore, whose columns are memory mapped from the index file created by SegmentIndexFile.
+
+	Segments are looked up by binary search in the sorted tables of the index
+	and interval indexes use the stored maximal subtree ends, so a lookup of a few segments
+	only reads the pages of the file it touches and the memory used does not grow with the database."""
+
+	def __init__(self):
+		super().__init__()
+
+		# tables of the index file and the map of the file, set by SegmentIndexFile.open
+		self.max_ends = None
+		self.sorted_segment_ids = None
+		self.segment_positions = None
+		self.sorted_person_ids = None
+		self.person_positions = None
+		self.index_map = None
+
+	def get_position(self, segment_id):
+		i = bisect_left(self.sorted_segment_ids, segment_id)
+
+		if i < len(self.sorted_segment_ids) and self.sorted_segment_ids[i] == segment_id:
+			return self.segment_positions[i]
+
+		return None
+
+	def get_positions_of_person(self, person_id) -> list:
+		begin = bisect_left(self.sorted_person_ids, person_id)
+		end = bisect_right(self.sorted_person_ids, person_id, begin)
+
+		return list(self.person_positions[begin:end])
+
+	def get_max_ends(self, chrom_id):
+		begin, end = self.chromosome_offsets[chrom_id]
+		return self.max_ends[begin:end]
@@ -0,0 +1,96 @@
+import os
+from typing import Iterator
+
+from genetic_genealogy.boxes.segments.segment_index_file import SegmentIndexFile
+from genetic_genealogy.boxes.segments.segment_store import SegmentStore
+from genetic_genealogy.csv_io import CSVHelper
+from genetic_genealogy.databases.segment_database import SQLiteSegmentDatabase, ShardedSegmentDatabase
+from genetic_genealogy.exit_codes import ExitCodes
+from genetic_genealogy.parsers.formats import SegmentFormatEnum
+from genetic_genealogy.project.config_helper import ConfigHelper
+
+
+def load_segment_store(segments_filename=None, from_database=False, mapped=False, segment_ids=None) -> SegmentStore:
+	"""Loads segments from CSV file into a SegmentStore. If filename is not specified,
+	segments are read from standard input. If from_database is True, segment database
+	specified in project configuration is used.
+
+	The segment database is loaded from its binary index file, if the index is up to date.
+	Otherwise, the csv or SQLite database is loaded and the index is created again.
+	If mapped is True, an up to date index file is memory mapped instead of being loaded.
+	If segment_ids are given, only the shards of the sharded segment database
+	with the chromosomes of these segments are loaded."""
+
+	try:
+		if from_database and ConfigHelper.get_database_backend() == "sharded":
+			return _load_sharded_store(mapped, segment_ids)
+
+		if from_database and ConfigHelper.get_database_backend() == "sqlite":
+			return _load_database_store(ConfigHelper.get_sqlite_database_location(), _read_sqlite_segments, mapped)
+
+		if from_database:
+			# the database might still be stored with other compression than the configured one
+			database_filename = CSVHelper.find_stored_location(ConfigHelper.get_segment_database_location())
+			return _load_database_store(
+				database_filename, lambda: CSVHelper.iterate_csv(database_filename, SegmentFormatEnum), mapped)
+
+		return SegmentStore.from_rows(CSVHelper.iterate_csv(segments_filename, SegmentFormatEnum))
+
+	except FileNotFoundError:
+		print("The source file was not found.")
+		exit(ExitCodes.no_such_file)
+	except IOError:
+		print("The source file could not be loaded.")
+		exit(ExitCodes.io_error)
+
+
+def _read_sqlite_segments() -> Iterator:
+	"""Yields all the segments from the SQLite database of the current project, they are read one by one."""
+	database = SQLiteSegmentDatabase()
+	database.load()
+
+	return database.get_records()
+
+
+def _load_sharded_store(mapped=False, segment_ids=None) -> SegmentStore:
+	"""Loads the shards of the sharded segment database, each of them from its own index file.
+	If segment_ids are given, only the shards with the chromosomes of these segments are loaded.
+	If a single shard is loaded and mapped is True, its index file is memory mapped."""
+	database = ShardedSegmentDatabase()
+	database.load()
+
+	chromosome_ids = None
+	if segment_ids is not None:
+		chromosome_ids = {database.get_chromosome_of_segment(segment_id) for segment_id in segment_ids}
+
+	shard_filenames = database.get_shard_locations(chromosome_ids)
+
+	if mapped and len(shard_filenames) == 1:
+		return _load_database_store(
+			shard_filenames[0], lambda: CSVHelper.iterate_csv(shard_filenames[0], SegmentFormatEnum), mapped)
+
+	return SegmentStore.concatenate(
+		_load_database_store(shard_filename, lambda: CSVHelper.iterate_csv(shard_filename, SegmentFormatEnum))
+		for shard_filename in shard_filenames
+	)
+
+
+def _load_database_store(database_filename, read_rows, mapped=False) -> SegmentStore:
+	"""Loads the segment database from its index file, or memory maps the index file if mapped is True.
+	If the index is missing or outdated, reads the database rows by calling read_rows and saves the index."""
+	store = SegmentIndexFile.open(database_filename) if mapped else SegmentIndexFile.load(database_filename)
+	if store is not None:
+		return store
+
+	# stat before reading, so that the index is outdated if the database changes while it is read,
+	# it also fails if there is no database
+	database_stat = os.stat(database_filename)
+	store = SegmentStore.from_rows(read_rows())
+
+	try:
+		SegmentIndexFile.save(store, database_filename, database_stat)
+	except IOError:
+		# the index only speeds up loading, the segments were loaded anyway
+		pass
+
+	return store
@@ -0,0 +1,153 @@
+from array import array
+
+from genetic_genealogy.parsers.formats import SegmentFormatEnum
+
+try:
+	import numpy
+except ImportError:
+	# numpy is optional, it only speeds up sorting of the segments
+	numpy = None
+
+
+class SegmentStore:
+	"""Holds the segment data needed for finding intersections in compact columns (arrays).
+
+	Segments are sorted by chromosome and start, the segments of one chromosome form a continuous block.
+	Bounds of the blocks are kept in the chromosome_offsets dict, where chromosome ids are keys
+	and values are (begin, end) tuples. Chromosomes are kept in the order in which they first appeared.
+	A segment takes 48 bytes. If NumPy is installed, it is used for sorting the segments when the store is created."""
+
+	# names and array type codes of all the columns
+	columns = [
+		("starts", 'q'),
+		("ends", 'q'),
+		("segment_ids", 'q'),
+		("person_ids", 'q'),
+		("lengths_cm", 'd'),
+		("snps", 'd')
+	]
+
+	def __init__(self):
+		self.chromosome_offsets = {}
+
+		for name, typecode in self.columns:
+			setattr(self, name, array(typecode))
+
+		# indexes are created lazily, only when they are needed
+		self._positions_by_id = None
+		self._positions_by_person_id = None
+
+	def __len__(self):
+		return len(self.starts)
+
+	def get_position(self, segment_id):
+		"""Returns the position of the segment with the given id in the store, None if there is no such segment."""
+		if self._positions_by_id is None:
+			self._positions_by_id = {segment_id: position for position, segment_id in enumerate(self.segment_ids)}
+
+		return self._positions_by_id.get(segment_id)
+
+	def get_positions_of_person(self, person_id) -> list:
+		"""Returns the positions of all the segments of the given person in the store, in the order of the store."""
+		if self._positions_by_person_id is None:
+			self._positions_by_person_id = {}
+
+			for position, other_id in enumerate(self.person_ids):
+				if other_id in self._positions_by_person_id.keys():
+					self._positions_by_person_id[other_id].append(position)
+				else:
+					self._positions_by_person_id[other_id] = [position]
+
+		return self._positions_by_person_id.get(person_id, [])
+
+	def get_chromosome(self, position):
+		"""Returns the id of the chromosome of the segment on the given position."""
+		for chrom_id, (begin, end) in self.chromosome_offsets.items():
+			if begin <= position < end:
+				return chrom_id
+
+		return None
+
+	def get_max_ends(self, chrom_id):
+		"""Returns the maximal subtree ends of the interval index of the given chromosome,
+		if they were computed before (see IntervalIndex), else returns None."""
+		return None
+
+	@staticmethod
+	def from_rows(rows) -> "SegmentStore":
+		"""Creates a store from records of the SegmentFormatEnum format, whose values are already converted.
+		The rows are consumed in a single pass and only the values needed by the store are kept,
+		so the rows can be yielded one by one and never have to be held in memory as a whole."""
+		sf = SegmentFormatEnum
+		unsorted = SegmentStore()
+
+		# positions of the segments of every chromosome in the unsorted store
+		positions_by_chromosome = {}
+
+		for row in rows:
+			chrom_id = row[sf.chromosome_id]
+			if chrom_id in positions_by_chromosome.keys():
+				positions_by_chromosome[chrom_id].append(len(unsorted))
+			else:
+				positions_by_chromosome[chrom_id] = array('q', [len(unsorted)])
+
+			unsorted.starts.append(row[sf.start])
+			unsorted.ends.append(row[sf.end])
+			unsorted.segment_ids.append(row[sf.segment_id])
+			unsorted.person_ids.append(row[sf.person_id])
+			unsorted.lengths_cm.append(SegmentStore.__to_number(row[sf.length_cm]))
+			unsorted.snps.append(SegmentStore.__to_number(row[sf.snps]))
+
+		store = SegmentStore()
+		begin = 0
+
+		for chrom_id, positions in positions_by_chromosome.items():
+			# the sort is stable, segments starting at the same position keep their order
+			order = SegmentStore.__sort_by_start(unsorted.starts, positions)
+
+			for name, _ in SegmentStore.columns:
+				getattr(store, name).extend(SegmentStore.__take(getattr(unsorted, name), order))
+
+			store.chromosome_offsets[chrom_id] = (begin, begin + len(positions))
+			begin += len(positions)
+
+		return store
+
+	@staticmethod
+	def concatenate(stores) -> "SegmentStore":
+		"""Creates a store holding the segments of all the given stores, the stores must have different chromosomes.
+		The chromosome blocks are kept in the order of the stores."""
+		result = SegmentStore()
+
+		for store in stores:
+			for chrom_id, (begin, end) in store.chromosome_offsets.items():
+				result.chromosome_offsets[chrom_id] = (len(result) + begin, len(result) + end)
+
+			for name, _ in SegmentStore.columns:
+				getattr(result, name).extend(getattr(store, name))
+
+		return result
+
+	@staticmethod
+	def __sort_by_start(starts, positions):
+		"""Returns the positions sorted by the starts of the segments on them, the sort is stable."""
+		if numpy is not None:
+			positions = numpy.frombuffer(positions, dtype=positions.typecode)
+			return positions[numpy.argsort(numpy.frombuffer(starts, dtype=starts.typecode)[positions], kind="stable")]
+
+		return sorted(positions, key=starts.__getitem__)
+
+	@staticmethod
+	def __take(column, order) -> array:
+		"""Returns an array of the values of the column on the positions given by the order."""
+		if numpy is not None:
+			return array(column.typecode, numpy.frombuffer(column, dtype=column.typecode)[order].tobytes())
+
+		return array(column.typecode, [column[position] for position in order])
+
+	@staticmethod
+	def __to_number(value) -> float:
+		"""Returns a centimorgan or SNP value as float, missing values are taken as 0."""
+		if value is None:
+			return 0.0
+		return float(value)
@@ -0,0 +1,164 @@
+import heapq
+from array import array
+from typing import Iterator
+
+
+def sweep_intersections(starts, ends, min_overlap=1, weight_thresholds=()):
+	"""Finds all pairs of intersecting segments on one chromosome.
+
+	The starts and ends are lists of integer coordinates, where the segment i starts at starts[i]
+	and ends at ends[i]. Segments must be sorted by start.
+
+	Only intersections at least min_overlap long are found.
+	The weight_thresholds is a sequence of (weights, minimum) pairs, where weights[i] is an amount
+	spread along the segment i (e.g. centimorgans or SNPs). The amount within an intersection is estimated
+	by the intersection_weight function and intersections with less than minimum are skipped.
+	Segments that cannot satisfy the thresholds on their own are skipped before they are opened.
+
+	Yields tuples (i, j, intersection_start, intersection_end) where i is the later segment
+	and j is a segment opened before it. For every i, the segments j are yielded
+	in the order in which they were opened.
+	Runs in O(n log n + k), where k is the number of intersections."""
+
+	# segments that end before the current start + min_overlap - 1 cannot intersect enough
+	reach = max(min_overlap, 1) - 1
+
+	# open segments ordered by their end, used for closing ended segments
+	open_by_end = []
+	# open segments in the order they were opened (dicts keep insertion order)
+	open_segments = {}
+
+	for i in range(len(starts)):
+		start = starts[i]
+		end = ends[i]
+
+		# prune segments, which are too small to have a large enough intersection with any other
+		if end - start < reach or any(weights[i] < minimum for weights, minimum in weight_thresholds):
+			continue
+
+		# close all segments that ended before the current one starts
+		while open_by_end and open_by_end[0][0] < start + reach:
+			_, closed = heapq.heappop(open_by_end)
+			del open_segments[closed]
+
+		# all the remaining open segments intersect the current one enough
+		for j in open_segments:
+			intersection_end = min(end, ends[j])
+
+			if weight_thresholds and not all(
+					intersection_weight(
+						weights[i], end - start + 1,
+						weights[j], ends[j] - starts[j] + 1,
+						intersection_end - start + 1
+					) >= minimum
+					for weights, minimum in weight_thresholds):
+				continue
+
+			yield i, j, start, intersection_end
+
+		heapq.heappush(open_by_end, (end, i))
+		open_segments[i] = None
+
+
+def sweep_intersections_to_arrays(starts, ends, min_overlap=1, weight_thresholds=()) -> tuple:
+	"""Finds all pairs of intersecting segments on one chromosome the same way as sweep_intersections does.
+	Returns the found intersections as a tuple of four compact int arrays - indexes of the later segments,
+	indexes of the earlier segments, intersection starts and intersection ends.
+
+	Used by worker processes, the arrays are much cheaper to send between processes than tuples."""
+
+	result = tuple(array('q') for _ in range(4))
+
+	for intersection in sweep_intersections(starts, ends, min_overlap, weight_thresholds):
+		for column, value in zip(result, intersection):
+			column.append(value)
+
+	return result
+
+
+def intersection_weight(weight_s, length_s, weight_r, length_r, intersection_length) -> float:
+	"""Estimates the amount of something (e.g. centimorgans or SNPs) within an intersection
+	of two segments, given the amounts within the whole segments and their lengths.
+
+	The amount is assumed to be spread evenly along the shorter of the segments,
+	if one segment contains the other one, the estimate is therefore exact.
+	The intersection is a part of both segments, so the estimate is never more than either of them holds."""
+
+	if length_s <= length_r:
+		estimate = weight_s * intersection_length / length_s
+	else:
+		estimate = weight_r * intersection_length / length_r
+
+	return min(estimate, weight_s, weight_r)
+
+
+def merge_segments_of_people(starts, ends, person_ids) -> Iterator:
+	"""Merges overlapping or adjacent segments of the same person on one chromosome.
+	Segments must be sorted by start.
+
+	Yields (person_id, start, end) tuples of the merged regions,
+	people are yielded ordered by their id, regions of one person ordered by start."""
+
+	# the sort is stable, segments of one person stay sorted by start
+	positions = sorted(range(len(starts)), key=lambda p: person_ids[p])
+
+	current_person = None
+	current_start = current_end = None
+
+	for position in positions:
+		person_id = person_ids[position]
+		start = starts[position]
+		end = ends[position]
+
+		if person_id == current_person and start <= current_end + 1:
+			current_end = max(current_end, end)
+			continue
+
+		if current_person is not None:
+			yield current_person, current_start, current_end
+
+		current_person = person_id
+		current_start = start
+		current_end = end
+
+	if current_person is not None:
+		yield current_person, current_start, current_end
+
+
+def triangulation_groups(starts, ends, person_ids, min_size=3) -> Iterator:
+	"""Finds all triangulation groups on one chromosome - maximal sets of at least min_size people,
+	whose segments all overlap a common region. Segments must be sorted by start.
+
+	Segments of every person are first merged, then the sorted breakpoints are swept once.
+	A set of people covering a region is maximal exactly when a segment ends right after
+	another one has started, so the groups are found without comparing pairs of segments.
+
+	Yields (common_start, common_end, person_ids) tuples ordered by the common region,
+	person_ids are sorted. Runs in O(n log n + s), where s is the total size of the groups."""
+
+	# (position, is start, person id), ends are moved after the last covered position,
+	# so on the same position the ends go first
+	breakpoints = []
+	for person_id, start, end in merge_segments_of_people(starts, ends, person_ids):
+		breakpoints.append((start, True, person_id))
+		breakpoints.append((end + 1, False, person_id))
+
+	breakpoints.sort()
+
+	active = set()
+	# start of the last opened region and whether the active set grew since the last group
+	last_start = None
+	grown = False
+
+	for position, is_start, person_id in breakpoints:
+		if is_start:
+			active.add(person_id)
+			last_start = position
+			grown = True
+			continue
+
+		if grown and len(active) >= min_size:
+			yield last_start, position - 1, sorted(active)
+
+		grown = False
+		active.remove(person_id)
@@ -1,60 +1,164 @@
+import bz2
 import csv
+import gzip
 import io
+import lzma
+import os
 import sys
+import zipfile
+from typing import Iterator
 
 from genetic_genealogy.helper import lower_no_whitespace
 from genetic_genealogy.exit_codes import ExitCodes
+from genetic_genealogy.parsers.records import Record, get_record_type, format_value
 
 
 class CSVHelper:
+	# size of the buffer used when writing csv files
+	__write_buffer_size = 1 << 20
+	# size of the blocks read from the end of a file when looking for its last complete row
+	__tail_block_size = 1 << 16
+
+	# modules compressing and decompressing files with the given extensions
+	__compressions = {".gz": gzip, ".bz2": bz2, ".xz": lzma}
+
+	@staticmethod
+	def open_text(filename, mode='r', newline=None, encoding="utf-8-sig", buffering=-1):
+		"""Opens the text file the same way as the built-in open does.
+		Files with the .gz, .bz2 or .xz extension are decompressed as they are read and compressed as they are written,
+		a .zip archive can be read, if it holds a single file. Raises IOError if the archive cannot be read."""
+		extension = CSVHelper.__get_compression(filename)
+
+		if extension == ".zip":
+			if mode != 'r':
+				raise IOError("Zip archives can only be read.")
+			return CSVHelper.__open_zip_member(filename, newline, encoding)
+
+		if extension != "":
+			return CSVHelper.__compressions[extension].open(filename, mode + 't', encoding=encoding, newline=newline)
+
+		return open(filename, mode, newline=newline, encoding=encoding, buffering=buffering)
+
+	@staticmethod
+	def __open_zip_member(filename, newline, encoding):
+		"""Opens the single file of the zip archive for reading as text."""
+		try:
+			with zipfile.ZipFile(filename) as archive:
+				members = [member for member in archive.infolist() if not member.is_dir()]
+				if len(members) != 1:
+					raise IOError("The zip archive " + filename + " does not hold a single file.")
+
+				# the member stays readable after the archive is closed
+				member_file = archive.open(members[0])
+
+		except zipfile.BadZipFile as error:
+			raise IOError(str(error))
+
+		return io.TextIOWrapper(member_file, encoding=encoding, newline=newline)
+
+	@staticmethod
+	def __get_compression(filename) -> str:
+		"""Returns the extension of the compression of the file (e.g. .gz) in lowercase,
+		an empty string if the file is not compressed."""
+		extension = os.path.splitext(filename)[1].lower()
+
+		if extension in CSVHelper.__compressions.keys() or extension == ".zip":
+			return extension
+
+		return ""
+
+	@staticmethod
+	def is_compressed(filename) -> bool:
+		"""Returns True if the file is compressed, given by its extension."""
+		return CSVHelper.__get_compression(filename) != ""
+
+	@staticmethod
+	def strip_compression(filename) -> str:
+		"""Returns the filename without the extension of its compression, e.g. all_segments.csv for all_segments.csv.gz."""
+		return filename[:len(filename) - len(CSVHelper.__get_compression(filename))]
+
+	@staticmethod
+	def find_stored_location(filename) -> str:
+		"""Returns the location of the csv file stored uncompressed or with any compression (e.g. after the compression
+		of the databases was changed in the project configuration), the given location is preferred.
+		If the file is not stored at all, returns the given location."""
+		root = CSVHelper.strip_compression(filename)
+
+		for location in [filename, root] + [root + extension for extension in CSVHelper.__compressions.keys()]:
+			if os.path.exists(location):
+				return location
+
+		return filename
+
 	@staticmethod
 	def load_csv_database(filename, database_format, searched_id) -> (int, list):
 		"""Reads the given csv file, finds the largest id (of given type specified by searched_id parameter),
-		returns the id and the file as a list of rows (dicts)."""
+		returns the id and the file as a list of records of the database_format.
+		Values of the typed columns of the format are converted when the rows are read."""
 
 		result = []
 		biggest_id = 0
 
+		for record in CSVHelper.iterate_csv_database(filename, database_format):
+			record_id = record[searched_id]
+			if record_id > biggest_id:
+				biggest_id = record_id
+
+			result.append(record)
+
+		return biggest_id, result
+
+	@staticmethod
+	def iterate_csv_database(filename, database_format) -> Iterator:
+		"""Yields records of the database_format read from the given csv database one by one,
+		the header is mapped to the format once, before the first record is read.
+		If the file does not exist or cannot be read, yields nothing."""
+
 		try:
-			with open(filename, 'r', encoding="utf-8-sig") as input_file:
-				reader = csv.DictReader(input_file)
-				reader.fieldnames = CSVHelper.__get_intenum_fieldnames(reader.fieldnames, database_format)
+			with CSVHelper.open_text(filename, 'r', newline='') as input_file:
+				reader = csv.reader(input_file)
+				fieldnames = CSVHelper.__get_intenum_fieldnames(next(reader, None), database_format)
 
-				if reader.fieldnames is None:
+				if fieldnames is None:
 					print("Wrong CSV database format.")
 					exit(ExitCodes.wrong_input_format)
 
-				for record in reader:
-					record_id = int(record[searched_id])
-					if record_id > biggest_id:
-						biggest_id = record_id
+				yield from CSVHelper.__read_records(reader, fieldnames, database_format)
 
-					result.append(record)
+		except ValueError:
+			print("Wrong CSV database format.")
+			exit(ExitCodes.wrong_input_format)
 
 		except IOError:
 			# if the file does not exist or cannot be read, do nothing
 			pass
 
-		return biggest_id, result
-
 	@staticmethod
 	def load_csv(filename, input_format_enum) -> list:
-		"""Simply loads a csv file using a DictReader, returns it as a list of dictionaries,
-		where keys are replaced with input_format_enum values.
-		Checks it the format of the file is valid, given the input_format_enum."""
+		"""Simply loads a csv file, returns it as a list of records of the input_format_enum,
+		which can be used as dicts keyed by the input_format_enum values.
+		Checks it the format of the file is valid, given the input_format_enum.
+		Values of the typed columns of the format are converted when the rows are read."""
+		return list(CSVHelper.iterate_csv(filename, input_format_enum))
+
+	@staticmethod
+	def iterate_csv(filename, input_format_enum) -> Iterator:
+		"""Yields records of the input_format_enum read from the csv file one by one, as load_csv does,
+		so that the file never has to be held in memory as a whole.
+		The file is opened and its format is checked when the first record is requested."""
 
 		if filename is None:
-			input_stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8-sig')
-			return CSVHelper.__load_from_reader(csv.DictReader(input_stream), input_format_enum)
+			input_stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8-sig', newline='')
+			yield from CSVHelper.__iterate_reader(csv.reader(input_stream), input_format_enum)
+			return
 
-		with open(filename, 'r', encoding="utf-8-sig") as input_file:
-			reader = csv.DictReader(input_file)
-			return CSVHelper.__load_from_reader(reader, input_format_enum)
+		with CSVHelper.open_text(filename, 'r', newline='') as input_file:
+			yield from CSVHelper.__iterate_reader(csv.reader(input_file), input_format_enum)
 
 	@staticmethod
 	def __get_intenum_fieldnames(fieldnames, input_format_enum) -> list:
 		"""Returns list of input_format_enum values corresponding to names of columns
-		in fieldnames in the same order.
+		in fieldnames in the same order, columns which are not in the format are None.
 		If the formats do not match, returns None."""
 		new_fieldnames = []
 
@@ -65,31 +169,65 @@ class CSVHelper:
 			return None
 
 		# replace fieldnames with enum values
-		if fieldnames is not None:
-			for index in fieldnames:
-				for value in input_format_enum:
-					if lower_no_whitespace(value.name) == lower_no_whitespace(index):
-						new_fieldnames.append(value)
-						break
+		for index in fieldnames:
+			column = None
+			for value in input_format_enum:
+				if lower_no_whitespace(value.name) == lower_no_whitespace(index):
+					column = value
+					break
+
+			new_fieldnames.append(column)
 
 		return new_fieldnames
 
 	@staticmethod
-	def __load_from_reader(reader, input_format_intenum) -> list:
-		"""Returns a list of dictionaries corresponding to rows of reader.
+	def __read_records(reader, fieldnames, record_format) -> Iterator:
+		"""Yields records of the record_format created from the rows of the csv reader.
+		The fieldnames are the format values of the columns of the rows. Empty rows are skipped.
+		Raises ValueError if a value of a typed column cannot be converted."""
+		record_type = get_record_type(record_format)
+
+		if fieldnames == list(record_format):
+			# the columns are ordered as in the format, rows are used as they are
+			for row in reader:
+				if row:
+					yield record_type.from_strings(row)
+			return
+
+		for row in reader:
+			if not row:
+				continue
+
+			values = [""] * len(record_format)
+			for column, value in zip(fieldnames, row):
+				if column is not None:
+					values[column] = value
+
+			yield record_type.from_strings(values)
+
+	@staticmethod
+	def __iterate_reader(reader, input_format_intenum) -> Iterator:
+		"""Yields records corresponding to rows of the csv reader.
 		Checks if the format is correct."""
-		reader.fieldnames = CSVHelper.__get_intenum_fieldnames(reader.fieldnames, input_format_intenum)
+		fieldnames = CSVHelper.__get_intenum_fieldnames(next(reader, None), input_format_intenum)
 
-		if reader.fieldnames is None:
+		if fieldnames is None:
 			print("Wrong input format.")
 			exit(ExitCodes.wrong_input_format)
 
-		return [row for row in reader]
+		try:
+			yield from CSVHelper.__read_records(reader, fieldnames, input_format_intenum)
+
+		except ValueError:
+			print("Wrong input format.")
+			exit(ExitCodes.wrong_input_format)
 
 	@staticmethod
-	def save_csv(database: list, database_format, filename=None) -> None:
+	def save_csv(database, database_format, filename=None) -> None:
 		"""Saves the list of dictionaries of a given format
-		to the given csv file. If no filename is None, standard output is used."""
+		to the given csv file. If no filename is None, standard output is used.
+		The database can be any iterable of rows (e.g. a generator), rows are written as they are consumed,
+		so the iterable never has to be held in memory as a whole."""
 
 		# no filename given --> write to stdout
 		if filename is None:
@@ -97,35 +235,137 @@ class CSVHelper:
 
 		else:
 			# file will be opened or created
-			with open(filename, 'w', newline='', encoding="utf-8-sig") as output_file:
+			with CSVHelper.open_text(
+					filename, 'w', newline='', buffering=CSVHelper.__write_buffer_size) as output_file:
 				CSVHelper.__write_to_writer(database, database_format, csv.writer(output_file))
 
 	@staticmethod
-	def __write_to_writer(database, database_format, writer) -> None:
-		"""Writes the database (list of rows) to the given writer."""
-		writer.writerow(database_format.get_header())
+	def replace_csv(database, database_format, filename) -> None:
+		"""Saves the list of dictionaries of a given format to the given csv file atomically.
+		The rows are written to a temporary file in the same directory, which then replaces the original file,
+		so the original file is kept whole if the writing is interrupted. Compressed files are written compressed."""
+		compression = CSVHelper.__get_compression(filename)
+		temporary_filename = filename[:len(filename) - len(compression)] + ".tmp" + compression
 
-		for row in database:
-			if type(row) is dict:
-				writer.writerow(row.values())
-			else:  # list
-				writer.writerow(row)
+		with CSVHelper.open_text(
+				temporary_filename, 'w', newline='', buffering=CSVHelper.__write_buffer_size) as output_file:
+			CSVHelper.__write_to_writer(database, database_format, csv.writer(output_file))
+
+		CSVHelper.__sync(temporary_filename)
+
+		os.replace(temporary_filename, filename)
+
+	@staticmethod
+	def __sync(filename) -> None:
+		"""Syncs the closed file to the disk, compressed files are only complete when they are closed."""
+		descriptor = os.open(filename, os.O_RDONLY)
+		try:
+			os.fsync(descriptor)
+		finally:
+			os.close(descriptor)
 
 	@staticmethod
-	def get_strenum_fieldnames(input_format, fieldnames) -> list:
-		"""Creates a list of values of given input_format (that is a strenum) in the same order as are the corresponding
-		strings in current fieldnames."""
+	def remove_incomplete_row(filename) -> bool:
+		"""Removes the last row of the given csv file, if it was not written completely (does not end with a newline).
+		That happens when appending to the file is interrupted. If no complete row remains, the file is removed.
+		Only the end of the file is read, so the check is cheap even for large files.
+		Compressed files are never appended to, so they are left as they are.
+		Returns True if an incomplete row was removed."""
+		if not os.path.exists(filename) or CSVHelper.is_compressed(filename):
+			return False
 
-		if fieldnames is None:
-			return None
+		removed = True
 
-		result = []
-		for name in fieldnames:
-			for enum_name in input_format:
-				if lower_no_whitespace(name) == lower_no_whitespace(enum_name):
-					result.append(enum_name)
+		with open(filename, 'rb+') as file:
+			end = file.seek(0, os.SEEK_END)
+			position = end
+
+			# only the end of the file is read, backwards in blocks until the last newline is found
+			while position > 0:
+				block_start = max(position - CSVHelper.__tail_block_size, 0)
+				file.seek(block_start)
+				block = file.read(position - block_start)
+
+				if position == end and block.endswith(b"\n"):
+					# the last row is complete
+					removed = False
+					break
+
+				newline = block.rfind(b"\n")
+				if newline >= 0:
+					file.truncate(block_start + newline + 1)
+					break
+
+				position = block_start
+			else:
+				removed = end > 0
+				file.truncate(0)
+
+		if os.path.getsize(filename) == 0:
+			os.remove(filename)
+
+		return removed
 
-		return result
+	@staticmethod
+	def can_append_csv(filename, database_format) -> bool:
+		"""Checks if rows of the given format can be appended to the given csv file.
+		That is when the file does not exist, is empty or its header is exactly the header of the format.
+		Compressed files are not appended to, because an interrupted append cannot be undone in them."""
+		if CSVHelper.is_compressed(filename):
+			return False
+
+		if not os.path.exists(filename) or os.path.getsize(filename) == 0:
+			return True
+
+		try:
+			with open(filename, 'r', newline='', encoding="utf-8-sig") as input_file:
+				return next(csv.reader(input_file), None) == database_format.get_header()
+
+		except IOError:
+			return False
+
+	@staticmethod
+	def append_csv(database, database_format, filename, sync=False) -> None:
+		"""Appends rows of a given format to the end of the given csv file.
+		If the file does not exist or is empty, it is created and the header is written first.
+		The database can be any iterable of rows, rows are written as they are consumed.
+		Rows appended to a compressed file are compressed as a new stream, which is read as a continuation of the file.
+		If sync is True, the appended rows are synced to the disk before returning."""
+
+		write_header = not os.path.exists(filename) or os.path.getsize(filename) == 0
+
+		# the byte order mark is only written at the beginning of the file
+		with CSVHelper.open_text(
+				filename, 'a', newline='', encoding="utf-8-sig" if write_header else "utf-8",
+				buffering=CSVHelper.__write_buffer_size) as output_file:
+			writer = csv.writer(output_file)
+
+			if write_header:
+				writer.writerow(database_format.get_header())
+
+			CSVHelper.__write_rows(database, database_format, writer)
+
+		if sync:
+			CSVHelper.__sync(filename)
+
+	@staticmethod
+	def __write_to_writer(database, database_format, writer) -> None:
+		"""Writes the database (iterable of rows) to the given writer."""
+		writer.writerow(database_format.get_header())
+		CSVHelper.__write_rows(database, database_format, writer)
+
+	@staticmethod
+	def __write_rows(database, database_format, writer) -> None:
+		"""Writes the rows of the database (iterable of rows) to the given writer, without header.
+		Values of dict rows and records are written in the order of the format columns,
+		missing values are left empty. Values of records are formatted as strings by the records."""
+		for row in database:
+			if type(row) is list:
+				writer.writerow(row)
+			elif isinstance(row, Record):
+				writer.writerow(row.to_strings())
+			else:  # dict
+				writer.writerow([format_value(row.get(column)) for column in database_format])
 
 	@staticmethod
 	def write_row_to_end(file, row):
@@ -0,0 +1,96 @@
+import os
+from abc import ABC
+
+from genetic_genealogy.csv_io import CSVHelper
+from genetic_genealogy.databases.csv_journal import CSVJournal
+from genetic_genealogy.databases.database import Database
+from genetic_genealogy.project.config_helper import ConfigHelper
+
+
+class CSVDatabase(Database, ABC):
+	"""Database stored in a csv file ordered by the id column.
+	Only the records added since the database was loaded are appended when it is saved.
+	Must come before the database class, whose format and indexes it uses, in the bases of a subclass."""
+
+	def __init__(self, file_name, id_column):
+		super().__init__()
+		self.__file_name = file_name
+		self.__id_column = id_column
+		self.__saved_count = 0
+		self.__appendable = True
+
+		# location of the file the database was loaded from, it differs from the configured location
+		# if the database is stored with other compression, the database is moved to the configured location when saved
+		self.__stored_file_name = self.__file_name
+
+		# records are journaled only if it is configured, but an existing journal is always replayed
+		self.__journal = CSVJournal(self.__file_name, self.format, self.__id_column)
+		self.__journal_records = ConfigHelper.get_database_journal()
+
+	def load(self):
+		"""Reads the csv file and stores it."""
+		self.__stored_file_name = CSVHelper.find_stored_location(self.__file_name)
+
+		# the last save might have been interrupted while appending, whether the records were journaled or not
+		if CSVHelper.remove_incomplete_row(self.__stored_file_name) and not self.__journal.exists():
+			print("The last record of " + self.__stored_file_name + " was not saved completely, it was removed.")
+
+		self._largest_ID, self._database = CSVHelper.load_csv_database(
+			self.__stored_file_name,
+			self.format,
+			self.__id_column
+		)
+		self._clear_indexes()
+
+		# records loaded from the file are already saved
+		self.__saved_count = len(self._database)
+		self.__appendable = self.__stored_file_name == self.__file_name \
+			and CSVHelper.can_append_csv(self.__file_name, self.format)
+
+		if self.__journal.exists():
+			# records which were added, but not saved, are added again and saved right away
+			for record in self.__journal.replay(self._largest_ID):
+				self._database.append(record)
+				self._largest_ID = max(self._largest_ID, record[self.__id_column])
+
+			self.save()
+
+	def save(self):
+		"""Saves the records added since the database was loaded by appending them to the end of the csv file,
+		ids only grow, so the file stays ordered by id. The whole file is only written,
+		if its header differs from the format (e.g. the columns are ordered differently),
+		if it is compressed or if it is stored with other compression than the configured one."""
+		if not self.__appendable:
+			self.compact()
+			return
+
+		# the journal must be on the disk before the database file is changed
+		self.__journal.sync()
+
+		CSVHelper.append_csv(self._database[self.__saved_count:], self.format, self.__file_name, sync=True)
+		self.__saved_count = len(self._database)
+
+		self.__journal.remove()
+
+	def compact(self):
+		"""Writes the whole database to the csv file, replacing its contents.
+		The database is written to a temporary file first, so the original file is never left half written."""
+		self.__journal.sync()
+
+		CSVHelper.replace_csv(self._database, self.format, self.__file_name)
+
+		if self.__stored_file_name != self.__file_name:
+			os.remove(self.__stored_file_name)
+			self.__stored_file_name = self.__file_name
+
+		self.__saved_count = len(self._database)
+		self.__appendable = CSVHelper.can_append_csv(self.__file_name, self.format)
+
+		self.__journal.remove()
+
+	def add_record(self, complete_parsed_record: dict) -> None:
+		"""Adds a complete parsed record to the database and writes it to the journal, if it is configured."""
+		super().add_record(complete_parsed_record)
+
+		if self.__journal_records:
+			self.__journal.add(complete_parsed_record)
@@ -0,0 +1,63 @@
+import csv
+import os
+
+from genetic_genealogy.csv_io import CSVHelper
+from genetic_genealogy.parsers.records import get_record_type
+
+
+class CSVJournal:
+	"""Journal of records added to a csv database, which were not saved to the database yet.
+
+	Every added record is written to the journal file right away. If the program ends before the database
+	is saved (or while it is being saved), the records are replayed from the journal when the database
+	is loaded next time. The journal is removed once the records are saved to the database."""
+
+	def __init__(self, database_filename, database_format, id_column):
+		self.__file_name = os.path.splitext(CSVHelper.strip_compression(database_filename))[0] + ".journal"
+		self.__format = database_format
+		self.__id_column = id_column
+		self.__file = None
+		self.__writer = None
+
+	def exists(self) -> bool:
+		return os.path.exists(self.__file_name)
+
+	def replay(self, largest_id) -> list:
+		"""Returns the journaled records with ids larger than largest_id, that is records not saved to the database.
+		An incomplete last record is skipped."""
+		if not self.exists():
+			return []
+
+		CSVHelper.remove_incomplete_row(self.__file_name)
+
+		record_type = get_record_type(self.__format)
+
+		with open(self.__file_name, 'r', newline='', encoding="utf-8") as journal_file:
+			records = [record_type.from_strings(row) for row in csv.reader(journal_file)]
+
+		return [record for record in records if record[self.__id_column] > largest_id]
+
+	def add(self, record) -> None:
+		"""Writes the record to the end of the journal. The record is flushed, but not synced to the disk."""
+		if self.__file is None:
+			self.__file = open(self.__file_name, 'a', newline='', encoding="utf-8")
+			self.__writer = csv.writer(self.__file)
+
+		self.__writer.writerow(record.to_strings())
+
+		self.__file.flush()
+
+	def sync(self) -> None:
+		"""Syncs the journaled records to the disk."""
+		if self.__file is not None:
+			os.fsync(self.__file.fileno())
+
+	def remove(self) -> None:
+		"""Removes the journal, must only be called after the journaled records were saved to the database."""
+		if self.__file is not None:
+			self.__file.close()
+			self.__file = None
+			self.__writer = None
+
+		if self.exists():
+			os.remove(self.__file_name)
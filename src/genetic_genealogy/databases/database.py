@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import Iterator
 
 
 class Database(ABC):
@@ -16,34 +17,32 @@ class Database(ABC):
 		"""Saves the database."""
 		pass
 
+	@abstractmethod
+	def compact(self) -> None:
+		"""Rewrites the whole stored database. The database must be loaded first."""
+		pass
+
 	@property
 	@abstractmethod
 	def format(self):
 		"""Represents the format of the database."""
 		pass
 
-	def get_id(self, parsed_record, source, searched_id_type) -> int:
-		"""If the parsed_record already exists, finds it by linearly going through the database and returns
-		the record ID (type of id specified by the searched_id_type parameter), else returns None."""
-		match_record_id = None
-
-		for old_record in self._database:
-			match = True
-
-			# compare all fields except for the id field
-			for index in self.format.comparison_key(source=source):
-				if index == searched_id_type:
-					continue
-
-				if str(old_record[index]) != str(parsed_record[index]):
-					match = False
-					break
+	def _clear_indexes(self) -> None:
+		"""Drops all the indexes of records, they are created again when they are needed.
+		Must be called whenever the records are loaded."""
+		pass
 
-			if match:
-				match_record_id = old_record[searched_id_type]
-				break
+	@abstractmethod
+	def get_id(self, parsed_record, source, searched_id_type) -> int:
+		"""If the parsed_record already exists, returns the record ID
+		(type of id specified by the searched_id_type parameter), else returns None.
+		Records are compared by the native values of the comparison key of the format."""
+		pass
 
-		return match_record_id
+	def get_records(self) -> Iterator:
+		"""Yields all the records of the database."""
+		return iter(self._database)
 
 	def get_new_id(self) -> int:
 		"""Creates a new maximum ID and returns it."""
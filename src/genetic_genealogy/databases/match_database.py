@@ -1,10 +1,13 @@
 from abc import ABC
+from typing import Iterator
 
 from genetic_genealogy.csv_io import CSVHelper
+from genetic_genealogy.databases.csv_database import CSVDatabase
 from genetic_genealogy.databases.database import Database
 from genetic_genealogy.helper import lower_one_space
 from genetic_genealogy.parsers.formats import MatchFormatEnum, SourceEnum
 from genetic_genealogy.project.config_helper import ConfigHelper
+from genetic_genealogy.sqlite_io import SQLiteHelper
 
 
 class MatchDatabase(Database, ABC):
@@ -16,29 +19,50 @@ class MatchDatabase(Database, ABC):
 		self.records_by_id = None
 		self.records_by_gedmatch_id = None
 
+	def _clear_indexes(self) -> None:
+		super()._clear_indexes()
+		self.records_by_name = None
+		self.records_by_id = None
+		self.records_by_gedmatch_id = None
+
 	def __create_records_by_name_dict(self) -> None:
 		"""Creates a dictionary of records. The keys are person names."""
-		result = {}
+		self.records_by_name = {}
 		for row in self._database:
-			result[row[self.format.person_name].lower()] = row
-
-		self.records_by_name = result
+			self.__add_to_records_by_name(row)
 
 	def __create_records_by_id_dict(self) -> None:
 		"""Creates a dictionary of records. The keys are person IDs."""
-		result = {}
+		self.records_by_id = {}
 		for row in self._database:
-			result[int(row[self.format.person_id])] = row
-
-		self.records_by_id = result
+			self.__add_to_records_by_id(row)
 
 	def __create_records_by_gedmatch_id_dict(self) -> None:
 		"""Creates a dictionary of records. The keys are the GEDmatch identificators."""
-		result = {}
+		self.records_by_gedmatch_id = {}
 		for row in self._database:
-			result[row[self.format.gedmatch_kit_id]] = row
+			self.__add_to_records_by_gedmatch_id(row)
+
+	def __add_to_records_by_name(self, row) -> None:
+		self.records_by_name[row[self.format.person_name].lower()] = row
+
+	def __add_to_records_by_id(self, row) -> None:
+		self.records_by_id[row[self.format.person_id]] = row
+
+	def __add_to_records_by_gedmatch_id(self, row) -> None:
+		self.records_by_gedmatch_id[row[self.format.gedmatch_kit_id]] = row
+
+	def add_record(self, complete_parsed_record: dict) -> None:
+		"""Adds a complete parsed record to the database list and to all the dictionaries of records
+		already created, so that the record can be found right away without creating them again."""
+		super().add_record(complete_parsed_record)
 
-		self.records_by_gedmatch_id = result
+		if self.records_by_name is not None:
+			self.__add_to_records_by_name(complete_parsed_record)
+		if self.records_by_id is not None:
+			self.__add_to_records_by_id(complete_parsed_record)
+		if self.records_by_gedmatch_id is not None:
+			self.__add_to_records_by_gedmatch_id(complete_parsed_record)
 
 	@property
 	def format(self):
@@ -92,7 +116,7 @@ class MatchDatabase(Database, ABC):
 					return None
 
 			# only return the id if all columns match
-			return int(potential_record[searched_id_type])
+			return potential_record[searched_id_type]
 
 		return None
 
@@ -102,31 +126,114 @@ class MatchDatabase(Database, ABC):
 		if self.records_by_id is None:
 			self.__create_records_by_id_dict()
 
-		if int(record_id) in self.records_by_id.keys():
+		if record_id in self.records_by_id.keys():
 			return self.records_by_id[record_id]
 
 		return None
 
 
-class CSVMatchDatabase(MatchDatabase):
+class CSVMatchDatabase(CSVDatabase, MatchDatabase):
 	"""Represents database of all the matches already parsed within the current project.
-	Within this implementation of the MatchDatabase abstract class, the data is stored in a csv file."""
+	Within this implementation of the MatchDatabase abstract class, the data is stored in a csv file.
+	CSV file location is read from project configuration."""
+
+	def __init__(self):
+		super().__init__(ConfigHelper.get_match_database_location(), MatchFormatEnum.person_id)
+
+
+class SQLiteMatchDatabase(MatchDatabase):
+	"""Represents database of all the matches already parsed within the current project.
+	Within this implementation of the MatchDatabase abstract class, the data is stored in a SQLite database.
+	Matches are not loaded into memory, only the looked up matches are read and only the new ones are written."""
+
+	__table = "matches"
+	# lower cased person name, used for searching matches by name
+	__name_key = "person_name_key"
 
 	def __init__(self):
 		super().__init__()
-		self.__file_name = ConfigHelper.get_match_database_location()
+		self.__file_name = ConfigHelper.get_sqlite_database_location()
+		self.__connection = None
 
 	def load(self):
-		"""Reads the given csv file and stores it.
-		CSV file location is read from project configuration."""
-		self._largest_ID, self._database = CSVHelper.load_csv_database(
-			self.__file_name,
-			self.format,
-			self.format.person_id
-		)
+		"""Opens the SQLite database, creates the match table and its indexes if they do not exist.
+		Database location is read from project configuration."""
+		self.__connection = SQLiteHelper.connect(self.__file_name)
+
+		SQLiteHelper.create_table(
+			self.__connection, self.__table, self.__get_columns(), self.format.person_id.name)
+
+		SQLiteHelper.create_index(self.__connection, self.__table, [self.__name_key])
+		SQLiteHelper.create_index(self.__connection, self.__table, [self.format.gedmatch_kit_id.name])
+
+		self._largest_ID = SQLiteHelper.get_largest_id(self.__connection, self.__table, self.format.person_id.name)
+		self._clear_indexes()
 
 	def save(self):
-		"""Saves the database to the given csv file."""
-		CSVHelper.save_csv(self._database, self.format, filename=self.__file_name)
+		"""Commits the added matches."""
+		self.__connection.commit()
+
+	def compact(self):
+		"""Commits the added matches and rebuilds the SQLite database file to reclaim unused space."""
+		self.__connection.commit()
+		self.__connection.execute("VACUUM")
+
+	def get_records(self) -> Iterator:
+		"""Yields all the records of the database ordered by person id."""
+		for values in SQLiteHelper.select(
+				self.__connection, self.__table, SQLiteHelper.get_columns(self.format),
+				order_by=self.format.person_id.name):
+			yield SQLiteHelper.to_record(values, self.format)
+
+	def add_record(self, complete_parsed_record: dict) -> None:
+		"""Inserts a complete parsed record into the database, it is stored when the database is saved."""
+		values = SQLiteHelper.to_values(complete_parsed_record, self.format, self.format.person_id)
+		name_key = complete_parsed_record[self.format.person_name].lower()
+
+		SQLiteHelper.insert(self.__connection, self.__table, self.__get_columns(), [values + (name_key,)])
+
+	def get_record_from_match_name(self, match_name):
+		"""Finds a record based on name and returns it. If no record is found, returns None.
+		If more matches have the same name, the last one is returned."""
+		return self.__select_last([self.__name_key], [lower_one_space(match_name)])
+
+	def get_record_from_gedmatch_id(self, match_gedmatch_id):
+		"""Finds a record based on gedmatch kit id and returns it.
+		If no record is found, returns None."""
+		return self.__select_last([self.format.gedmatch_kit_id.name], [match_gedmatch_id])
+
+	def get_record_from_id(self, record_id: int):
+		"""Returns a record of given id. record_id must be int."""
+		return self.__select_last([self.format.person_id.name], [record_id])
+
+	def __get_columns(self) -> list:
+		return SQLiteHelper.get_columns(self.format) + [self.__name_key]
+
+	def __select(self, where_columns, parameters) -> list:
+		"""Returns records, where the where_columns are equal to parameters, ordered by person id."""
+		return [
+			SQLiteHelper.to_record(values, self.format)
+			for values in SQLiteHelper.select(
+				self.__connection, self.__table, SQLiteHelper.get_columns(self.format),
+				where_columns, parameters, order_by=self.format.person_id.name)
+		]
+
+	def __select_last(self, where_columns, parameters):
+		"""Returns the last record, where the where_columns are equal to parameters, None if there is no such record.
+		The last record is returned, the same way as in dicts of records created by the CSV database."""
+		records = self.__select(where_columns, parameters)
+
+		if len(records) == 0:
+			return None
+
+		return records[-1]
+
+
+def create_match_database() -> MatchDatabase:
+	"""Creates the match database of the current project, the type of storage is read from project configuration."""
+	if ConfigHelper.get_database_backend() == "sqlite":
+		return SQLiteMatchDatabase()
+
+	return CSVMatchDatabase()
 
 # endregion
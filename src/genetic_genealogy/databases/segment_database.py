@@ -1,10 +1,16 @@
+import os
+import re
 from abc import ABC
+from typing import Iterator
 
 from genetic_genealogy.project.config_helper import ConfigHelper
 from genetic_genealogy.csv_io import CSVHelper
+from genetic_genealogy.sqlite_io import SQLiteHelper
+from genetic_genealogy.databases.csv_journal import CSVJournal
+from genetic_genealogy.databases.csv_database import CSVDatabase
 from genetic_genealogy.databases.database import Database
-from genetic_genealogy.helper import lower_no_whitespace
-from genetic_genealogy.parsers.formats import SegmentFormatEnum, SourceEnum
+from genetic_genealogy.parsers.formats import SegmentFormatEnum, SegmentShardFormatEnum, SourceEnum
+from genetic_genealogy.parsers.records import format_value
 
 
 # region segment databases
@@ -14,70 +20,69 @@ class SegmentDatabase(Database, ABC):
 
 	def __init__(self):
 		super().__init__()
-		self._segments_by_person_name = None
-		self._segments_by_chromosome = None
+		self._segments_by_position = None
 
 	@property
 	def format(self):
 		return SegmentFormatEnum
 
-	def _create_segments_by_chromosome(self) -> None:
-		"""Creates a dict where chromosome ids are keys and values are lists of segments.
-		Will be used for faster computation."""
+	def _clear_indexes(self) -> None:
+		super()._clear_indexes()
+		self._segments_by_position = None
 
-		self._segments_by_chromosome = {}
+	def _create_segments_by_position(self) -> None:
+		"""Creates a dict where (person id, chromosome id, start, end) tuples are keys
+		and values are lists of segments, will be used for faster computation."""
+		self._segments_by_position = {}
 
 		for segment in self._database:
-			chrom_id = segment[self.format.chromosome_id]
-			if chrom_id in self._segments_by_chromosome.keys():
-				self._segments_by_chromosome[chrom_id].append(segment)
-			else:
-				self._segments_by_chromosome[chrom_id] = [segment]
+			self.__add_to_segments_by_position(segment)
 
-	def _create_segments_by_person_name(self) -> None:
-		"""Creates a dict where names are keys and values are lists of segments,
-		will be used for faster computation. All names are stripped of any spaces and lower cased."""
-		self._segments_by_person_name = {}
+	def __add_to_segments_by_position(self, segment) -> None:
+		position = self._get_position(segment)
 
-		for segment in self._database:
-			if segment[self.format.source] == SourceEnum.FamilyTreeDNA.name:
-				name = lower_no_whitespace(segment[self.format.person_name])
+		if position in self._segments_by_position.keys():
+			self._segments_by_position[position].append(segment)
+		else:
+			self._segments_by_position[position] = [segment]
 
-				if name in self._segments_by_person_name.keys():
-					self._segments_by_person_name[name].append(segment)
-				else:
-					self._segments_by_person_name[name] = [segment]
+	def _get_position(self, segment) -> tuple:
+		return (
+			segment[self.format.person_id],
+			segment[self.format.chromosome_id],
+			segment[self.format.start],
+			segment[self.format.end]
+		)
 
 	def get_id(self, parsed_record, source, searched_id_type=SegmentFormatEnum.segment_id) -> int:
 		"""Finds ID of the segment from the record.
 		If the segment is not in the database, returns None."""
 
-		if self._segments_by_person_name is None:
-			self._create_segments_by_person_name()
-		if self._segments_by_chromosome is None:
-			self._create_segments_by_chromosome()
+		if source not in [SourceEnum.FamilyTreeDNA, SourceEnum.GEDmatch]:
+			return None
 
-		# data from ftdna -> search by person name
-		if source == SourceEnum.FamilyTreeDNA:
-			name = lower_no_whitespace(parsed_record[self.format.person_name])
+		# only segments of the same person on the same position are compared
+		for segment in self._get_segments_at_position(self._get_position(parsed_record)):
 
-			if name in self._segments_by_person_name.keys():
-				for segment in self._segments_by_person_name[name]:
+			if self.__compare_segments(segment, parsed_record, source, searched_id_type):
+				return segment[searched_id_type]
 
-					if self.__compare_segments(segment, parsed_record, source, searched_id_type):
-						return segment[searched_id_type]
+		return None
 
-		# data from gedmatch -> only search by chromosome
-		if source == SourceEnum.GEDmatch:
-			chrom_id = parsed_record[self.format.chromosome_id]
+	def _get_segments_at_position(self, position) -> list:
+		"""Returns all segments with the given (person id, chromosome id, start, end) tuple."""
+		if self._segments_by_position is None:
+			self._create_segments_by_position()
 
-			if chrom_id in self._segments_by_chromosome:
-				for segment in self._segments_by_chromosome[chrom_id]:
+		return self._segments_by_position.get(position, [])
 
-					if self.__compare_segments(segment, parsed_record, source, searched_id_type):
-						return segment[searched_id_type]
+	def add_record(self, complete_parsed_record: dict) -> None:
+		"""Adds a complete parsed record to the database list and to the index of segments by position,
+		so that the record can be found by get_id right away."""
+		super().add_record(complete_parsed_record)
 
-		return None
+		if self._segments_by_position is not None:
+			self.__add_to_segments_by_position(complete_parsed_record)
 
 	def __compare_segments(self, segment, parsed_record, source, searched_id_type) -> bool:
 		match = True
@@ -85,30 +90,396 @@ class SegmentDatabase(Database, ABC):
 			if index == searched_id_type:
 				continue
 
-			if str(segment[index]) != str(parsed_record[index]):
+			if segment[index] != parsed_record[index]:
 				match = False
 				break
 
 		return match
 
 
-class CSVSegmentDatabase(SegmentDatabase):
+class CSVSegmentDatabase(CSVDatabase, SegmentDatabase):
+	"""Represents database of all the segments already parsed within the current project.
+	Within this implementation of the SegmentDatabase abstract class, the data is stored in a csv file.
+	CSV file location is read from project configuration."""
+
+	def __init__(self):
+		super().__init__(ConfigHelper.get_segment_database_location(), SegmentFormatEnum.segment_id)
+
+
+class SQLiteSegmentDatabase(SegmentDatabase):
 	"""Represents database of all the segments already parsed within the current project.
-	Within this implementation of the SegmentDatabase abstract class, the data is stored in a csv file."""
+	Within this implementation of the SegmentDatabase abstract class, the data is stored in a SQLite database.
+	Segments are not loaded into memory, only the looked up segments are read and only the new ones are written."""
+
+	__table = "segments"
 
 	def __init__(self):
 		super().__init__()
-		self.__file_name = ConfigHelper.get_segment_database_location()
+		self.__file_name = ConfigHelper.get_sqlite_database_location()
+		self.__connection = None
 
 	def load(self):
-		"""Reads the given csv file and stores it. CSV file location is read from project configuration."""
+		"""Opens the SQLite database, creates the segment table and its indexes if they do not exist.
+		Database location is read from project configuration."""
+		self.__connection = SQLiteHelper.connect(self.__file_name)
+
+		SQLiteHelper.create_table(
+			self.__connection, self.__table, SQLiteHelper.get_columns(self.format), self.format.segment_id.name)
+
+		# index of segment coordinates used by get_id and index of chromosomes
+		SQLiteHelper.create_index(self.__connection, self.__table, ["person_id", "chromosome_id", "start", "end"])
+		SQLiteHelper.create_index(self.__connection, self.__table, ["chromosome_id", "start", "end"])
+
+		self._largest_ID = SQLiteHelper.get_largest_id(self.__connection, self.__table, self.format.segment_id.name)
+		self._clear_indexes()
 
-		self._largest_ID, self._database = CSVHelper.load_csv_database(
-			self.__file_name,
-			self.format,
-			self.format.segment_id
+	def save(self):
+		"""Commits the added segments."""
+		self.__connection.commit()
+
+	def compact(self):
+		"""Commits the added segments and rebuilds the SQLite database file to reclaim unused space."""
+		self.__connection.commit()
+		self.__connection.execute("VACUUM")
+
+	def get_records(self) -> Iterator:
+		"""Yields all the records of the database ordered by segment id."""
+		for values in SQLiteHelper.select(
+				self.__connection, self.__table, SQLiteHelper.get_columns(self.format),
+				order_by=self.format.segment_id.name):
+			yield SQLiteHelper.to_record(values, self.format)
+
+	def add_record(self, complete_parsed_record: dict) -> None:
+		"""Inserts a complete parsed record into the database, it is stored when the database is saved."""
+		SQLiteHelper.insert(
+			self.__connection, self.__table, SQLiteHelper.get_columns(self.format),
+			[SQLiteHelper.to_values(complete_parsed_record, self.format, self.format.segment_id)]
 		)
 
+	def _get_segments_at_position(self, position) -> list:
+		"""Returns all segments with the given (person id, chromosome id, start, end) tuple."""
+		return [
+			SQLiteHelper.to_record(values, self.format)
+			for values in SQLiteHelper.select(
+				self.__connection, self.__table, SQLiteHelper.get_columns(self.format),
+				["person_id", "chromosome_id", "start", "end"], [format_value(value) for value in position],
+				order_by=self.format.segment_id.name)
+		]
+
+
+class ShardedSegmentDatabase(SegmentDatabase):
+	"""Represents database of all the segments already parsed within the current project.
+	Within this implementation of the SegmentDatabase abstract class, the segments of every chromosome
+	are stored in a separate csv file (shard) in the directory given by project configuration.
+
+	The manifest in the same directory lists the shards (see SegmentShardFormatEnum), it is replaced
+	only after all the shards are saved, so it always describes completely saved shards.
+	A shard is loaded only when segments of its chromosome are needed
+	and only the shards with new segments are written when the database is saved.
+	Shards are compressed as configured, compressed shards are always written whole."""
+
+	__manifest_name = "manifest.csv"
+
+	def __init__(self):
+		super().__init__()
+		self.__directory = ConfigHelper.get_segment_shards_location()
+		self.__manifest_file_name = os.path.join(self.__directory, self.__manifest_name)
+
+		# manifest records of the saved shards by chromosome ids
+		self.__shards = {}
+
+		# segments of the loaded shards by chromosome ids, the new segments are at the ends of the lists
+		self.__segments_by_chromosome = {}
+		self.__saved_counts = {}
+		self.__segments_by_position = {}
+
+		# records are journaled only if it is configured, but an existing journal is always replayed
+		self.__journal = CSVJournal(self.__manifest_file_name, self.format, self.format.segment_id)
+		self.__journal_records = ConfigHelper.get_database_journal()
+
+	def load(self):
+		"""Reads the manifest of the shards, the shards themselves are loaded when they are needed.
+		The shard files are the source of truth: the manifest record of a shard, whose file size differs
+		from the manifest (e.g. after an interrupted save), is created again from the file,
+		records of missing files are removed and shard files missing in the manifest are added to it."""
+		self._largest_ID, shards = CSVHelper.load_csv_database(
+			self.__manifest_file_name,
+			SegmentShardFormatEnum,
+			SegmentShardFormatEnum.largest_segment_id
+		)
+		self._clear_indexes()
+
+		self.__shards = {shard[SegmentShardFormatEnum.chromosome_id]: shard for shard in shards}
+		self.__segments_by_chromosome = {}
+		self.__saved_counts = {}
+		self.__segments_by_position = {}
+
+		repaired = False
+
+		for chrom_id, shard in list(self.__shards.items()):
+			location = self.__get_location(shard)
+
+			if not os.path.exists(location):
+				del self.__shards[chrom_id]
+				repaired = True
+
+			elif os.path.getsize(location) != shard[SegmentShardFormatEnum.size]:
+				self.__repair_shard(chrom_id, shard[SegmentShardFormatEnum.file_name])
+				repaired = True
+
+		for file_name in self.__find_unlisted_files():
+			repaired = self.__repair_shard(None, file_name) or repaired
+
+		if repaired:
+			self._largest_ID = max(
+				[shard[SegmentShardFormatEnum.largest_segment_id] for shard in self.__shards.values()], default=0)
+			os.makedirs(self.__directory, exist_ok=True)
+			CSVHelper.replace_csv(self.__shards.values(), SegmentShardFormatEnum, self.__manifest_file_name)
+
+		if self.__journal.exists():
+			# records which were added, but not saved, are added again and saved right away
+			for record in self.__journal.replay(self._largest_ID):
+				self.__add_segment(record)
+				self._largest_ID = max(self._largest_ID, record[self.format.segment_id])
+
+			self.save()
+
 	def save(self):
-		"""Saves the output to the specified file."""
-		CSVHelper.save_csv(self._database, self.format, filename=self.__file_name)
+		"""Appends the new segments to the ends of their shards, new shards are created,
+		then the manifest is replaced. Compressed shards with new segments are replaced whole."""
+		self.__journal.sync()
+		os.makedirs(self.__directory, exist_ok=True)
+
+		for chrom_id, segments in self.__segments_by_chromosome.items():
+			new_segments = segments[self.__saved_counts[chrom_id]:]
+			if len(new_segments) == 0:
+				continue
+
+			if chrom_id in self.__shards.keys() and CSVHelper.is_compressed(self.__get_location(self.__shards[chrom_id])):
+				shard = self.__shards[chrom_id]
+				CSVHelper.replace_csv(segments, self.format, self.__get_location(shard))
+			elif chrom_id in self.__shards.keys():
+				shard = self.__shards[chrom_id]
+				CSVHelper.append_csv(new_segments, self.format, self.__get_location(shard), sync=True)
+			else:
+				shard = self.__create_shard(chrom_id)
+				# unlisted files are added to the manifest when it is loaded, so the file does not hold any segments
+				CSVHelper.replace_csv(new_segments, self.format, self.__get_location(shard))
+				self.__shards[chrom_id] = shard
+
+			self.__update_shard(shard, new_segments)
+			self.__saved_counts[chrom_id] = len(segments)
+
+		CSVHelper.replace_csv(self.__shards.values(), SegmentShardFormatEnum, self.__manifest_file_name)
+
+		self.__journal.remove()
+
+	def compact(self):
+		"""Rewrites all the shards and the manifest, every file is replaced only after it is written whole.
+		Shards stored with other compression than the configured one are moved to files with the configured one."""
+		self.__journal.sync()
+		os.makedirs(self.__directory, exist_ok=True)
+
+		for chrom_id in list(self.__shards.keys()) + list(self.__segments_by_chromosome.keys()):
+			self.__load_shard(chrom_id)
+
+		# files of the shards, which are replaced by files with other compression
+		replaced_locations = []
+
+		for chrom_id, segments in self.__segments_by_chromosome.items():
+			if chrom_id in self.__shards.keys():
+				shard = self.__shards[chrom_id]
+
+				file_name = self.__get_file_name(chrom_id)
+				if shard[SegmentShardFormatEnum.file_name] != file_name:
+					replaced_locations.append(self.__get_location(shard))
+					shard[SegmentShardFormatEnum.file_name] = file_name
+
+			elif len(segments) > 0:
+				shard = self.__create_shard(chrom_id)
+			else:
+				continue
+
+			CSVHelper.replace_csv(segments, self.format, self.__get_location(shard))
+
+			shard[SegmentShardFormatEnum.segment_count] = 0
+			shard[SegmentShardFormatEnum.largest_segment_id] = 0
+			shard[SegmentShardFormatEnum.segment_id_ranges] = ""
+			self.__update_shard(shard, segments)
+
+			self.__shards[chrom_id] = shard
+			self.__saved_counts[chrom_id] = len(segments)
+
+		CSVHelper.replace_csv(self.__shards.values(), SegmentShardFormatEnum, self.__manifest_file_name)
+
+		# the replaced files are not listed in the manifest anymore
+		for location in replaced_locations:
+			if os.path.exists(location):
+				os.remove(location)
+
+		self.__journal.remove()
+
+	def get_records(self) -> Iterator:
+		"""Yields all the records of the database by chromosomes, shards which were not loaded are only read."""
+		for chrom_id in self.__shards.keys():
+			if chrom_id in self.__segments_by_chromosome.keys():
+				yield from self.__segments_by_chromosome[chrom_id]
+			else:
+				yield from self.__read_shard(self.__shards[chrom_id])
+
+		for chrom_id, segments in self.__segments_by_chromosome.items():
+			if chrom_id not in self.__shards.keys():
+				yield from segments
+
+	def add_record(self, complete_parsed_record: dict) -> None:
+		"""Adds a complete parsed record to the shard of its chromosome and writes it to the journal,
+		if it is configured. The record is saved when the database is saved."""
+		self.__add_segment(complete_parsed_record)
+
+		if self.__journal_records:
+			self.__journal.add(complete_parsed_record)
+
+	def get_shard_locations(self, chromosome_ids=None) -> list:
+		"""Returns the locations of the saved shards in the order of the manifest.
+		If chromosome_ids are given, only the shards of these chromosomes are returned."""
+		return [
+			self.__get_location(shard)
+			for chrom_id, shard in self.__shards.items()
+			if chromosome_ids is None or chrom_id in chromosome_ids
+		]
+
+	def get_chromosome_of_segment(self, segment_id):
+		"""Returns the chromosome id of the saved segment with the given id, found by the id ranges of the shards.
+		If there is no such segment, returns None."""
+		for chrom_id, shard in self.__shards.items():
+			for id_range in shard[SegmentShardFormatEnum.segment_id_ranges].split():
+				first, last = id_range.split("-")
+				if int(first) <= segment_id <= int(last):
+					return chrom_id
+
+		return None
+
+	def _get_segments_at_position(self, position) -> list:
+		"""Returns all segments with the given (person id, chromosome id, start, end) tuple,
+		loads the shard of the chromosome if it was not loaded yet."""
+		self.__load_shard(position[1])
+		return self.__segments_by_position.get(position, [])
+
+	def __add_segment(self, segment) -> None:
+		chrom_id = segment[self.format.chromosome_id]
+		self.__load_shard(chrom_id)
+
+		self.__segments_by_chromosome[chrom_id].append(segment)
+		self.__add_to_segments_by_position(segment)
+
+	def __add_to_segments_by_position(self, segment) -> None:
+		position = self._get_position(segment)
+
+		if position in self.__segments_by_position.keys():
+			self.__segments_by_position[position].append(segment)
+		else:
+			self.__segments_by_position[position] = [segment]
+
+	def __load_shard(self, chrom_id) -> None:
+		"""Loads the segments of the chromosome, if they were not loaded yet."""
+		if chrom_id in self.__segments_by_chromosome.keys():
+			return
+
+		segments = self.__read_shard(self.__shards[chrom_id]) if chrom_id in self.__shards.keys() else []
+
+		self.__segments_by_chromosome[chrom_id] = segments
+		self.__saved_counts[chrom_id] = len(segments)
+
+		for segment in segments:
+			self.__add_to_segments_by_position(segment)
+
+	def __read_shard(self, shard) -> list:
+		"""Reads the segments of the shard, segments over the count stated in the manifest were not saved completely."""
+		segments = CSVHelper.load_csv_database(self.__get_location(shard), self.format, self.format.segment_id)[1]
+		return segments[:shard[SegmentShardFormatEnum.segment_count]]
+
+	def __get_location(self, shard) -> str:
+		return os.path.join(self.__directory, shard[SegmentShardFormatEnum.file_name])
+
+	def __find_unlisted_files(self) -> list:
+		"""Returns the names of the shard files in the directory, which are not in the manifest.
+		Files of listed chromosomes stored with other compression (left by an interrupted compaction) are skipped."""
+		if not os.path.isdir(self.__directory):
+			return []
+
+		listed = {CSVHelper.strip_compression(shard[SegmentShardFormatEnum.file_name]) for shard in self.__shards.values()}
+
+		return sorted(
+			file_name for file_name in os.listdir(self.__directory)
+			if re.fullmatch(r"chromosome_[0-9A-Za-z_]*\.csv", CSVHelper.strip_compression(file_name))
+			and CSVHelper.strip_compression(file_name) not in listed
+		)
+
+	def __repair_shard(self, chrom_id, file_name) -> bool:
+		"""Creates the manifest record of the shard in the given file again from the segments in the file.
+		An incomplete last segment, left by an interrupted save, is removed. If chrom_id is None,
+		it is read from the file. Shards with no complete segment are removed from the manifest.
+		Returns True if the manifest was changed."""
+		location = os.path.join(self.__directory, file_name)
+		CSVHelper.remove_incomplete_row(location)
+
+		segments = []
+		if os.path.exists(location):
+			segments = CSVHelper.load_csv_database(location, self.format, self.format.segment_id)[1]
+
+		if len(segments) == 0:
+			return self.__shards.pop(chrom_id, None) is not None
+
+		if chrom_id is None:
+			chrom_id = segments[0][self.format.chromosome_id]
+			if chrom_id in self.__shards.keys():
+				# another file of the chromosome is listed
+				return False
+
+		shard = SegmentShardFormatEnum.create_record([chrom_id, file_name, 0, 0, 0, ""])
+		self.__update_shard(shard, segments)
+		self.__shards[chrom_id] = shard
+
+		return True
+
+	@staticmethod
+	def __create_shard(chrom_id):
+		"""Creates the manifest record of a new shard."""
+		return SegmentShardFormatEnum.create_record([chrom_id, ShardedSegmentDatabase.__get_file_name(chrom_id), 0, 0, 0, ""])
+
+	@staticmethod
+	def __get_file_name(chrom_id) -> str:
+		"""Returns the name of the file of the shard, which is made of the chromosome id and the configured compression."""
+		return "chromosome_" + re.sub(r"[^0-9A-Za-z]", "_", chrom_id) + ".csv" + ConfigHelper.get_database_compression()
+
+	def __update_shard(self, shard, new_segments) -> None:
+		"""Updates the manifest record of the shard after the new segments were saved to it."""
+		ranges = shard[SegmentShardFormatEnum.segment_id_ranges].split()
+
+		for segment in new_segments:
+			segment_id = segment[self.format.segment_id]
+
+			if len(ranges) > 0 and int(ranges[-1].split("-")[1]) + 1 == segment_id:
+				ranges[-1] = ranges[-1].split("-")[0] + "-" + str(segment_id)
+			else:
+				ranges.append(str(segment_id) + "-" + str(segment_id))
+
+		shard[SegmentShardFormatEnum.size] = os.path.getsize(self.__get_location(shard))
+		shard[SegmentShardFormatEnum.segment_count] += len(new_segments)
+		shard[SegmentShardFormatEnum.largest_segment_id] = max(
+			[shard[SegmentShardFormatEnum.largest_segment_id]]
+			+ [segment[self.format.segment_id] for segment in new_segments])
+		shard[SegmentShardFormatEnum.segment_id_ranges] = " ".join(ranges)
+
+
+def create_segment_database() -> SegmentDatabase:
+	"""Creates the segment database of the current project, the type of storage is read from project configuration."""
+	if ConfigHelper.get_database_backend() == "sqlite":
+		return SQLiteSegmentDatabase()
+
+	if ConfigHelper.get_database_backend() == "sharded":
+		return ShardedSegmentDatabase()
+
+	return CSVSegmentDatabase()
+
+# endregion
@@ -8,3 +8,4 @@ class ExitCodes(IntEnum):
 	io_error = 4
 	no_current_project = 5
 	unique_required = 6
+	wrong_arguments = 7
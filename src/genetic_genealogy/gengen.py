@@ -9,9 +9,9 @@ if 'genetic_genealogy' not in sys.modules:
 	sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
 
 from genetic_genealogy.usage.parse import parse_matches, parse_segments, parse_shared_matches
-from genetic_genealogy.usage import find_segment_intersections
+from genetic_genealogy.usage import find_segment_intersections, find_coverage, find_triangulation_groups
 from genetic_genealogy.project import checkout_project, create_new_project, delete_project, list_projects, \
-	current_project, config_helper
+	current_project, config_helper, migrate_database, compact_database
 
 
 def save_command(working_dir, args):
@@ -68,6 +68,17 @@ def main():
 	current_args.set_defaults(func=current_project.current_project)
 	# endregion
 
+	# region migrate-database
+	migrate_args = subparsers.add_parser("migrate-database")
+	migrate_args.add_argument("-b", "--backend", choices=["sqlite", "sharded"], default="sqlite")
+	migrate_args.set_defaults(func=migrate_database.migrate_database)
+	# endregion
+
+	# region compact-database
+	compact_args = subparsers.add_parser("compact-database")
+	compact_args.set_defaults(func=compact_database.compact_database)
+	# endregion
+
 	# region parse-matches
 	p_matches_args = subparsers.add_parser("parse-matches")
 	p_matches_args.set_defaults(func=parse_matches.parse_matches)
@@ -88,6 +99,7 @@ def main():
 	p_segments_args.add_argument("-sf", "--source_file")
 	p_segments_args.add_argument("-of", "--output_file")
 	p_segments_args.add_argument("-v", "--verbose", action="store_true")
+	p_segments_args.add_argument("-j", "--jobs", type=int, default=1)
 
 	s_me_group = p_segments_args.add_mutually_exclusive_group(required=True)
 	s_me_group.add_argument("--ftdna", action="store_true")
@@ -113,15 +125,46 @@ def main():
 	intersection_args.set_defaults(func=find_segment_intersections.find_segment_intersections)
 
 	intersection_args.add_argument("-of", "--output_file")
+	intersection_args.add_argument("-j", "--jobs", type=int, default=1)
+	intersection_args.add_argument("--min_overlap", type=int, default=0)
+	intersection_args.add_argument("--min_cm", type=float, default=0)
+	intersection_args.add_argument("--min_snps", type=int, default=0)
+	intersection_args.add_argument("--incremental", action="store_true")
 
 	i_group_input = intersection_args.add_mutually_exclusive_group()
 	i_group_input.add_argument("-sf", "--source_file")
 	i_group_input.add_argument("-fd", "--from_database", action="store_true")
 
 	i_group = intersection_args.add_mutually_exclusive_group()
-	i_group.add_argument("-sid", "--segment_id", type=int)
-	i_group.add_argument("-pid", "--person_id", type=int)
+	i_group.add_argument("-sid", "--segment_id", type=int, nargs="+")
+	i_group.add_argument("-pid", "--person_id", type=int, nargs="+")
+	i_group.add_argument("-sidf", "--segment_ids_file")
+	i_group.add_argument("-pidf", "--person_ids_file")
+
+	# endregion
+
+	# region coverage
+	coverage_args = subparsers.add_parser("coverage")
+	coverage_args.set_defaults(func=find_coverage.find_coverage)
+
+	coverage_args.add_argument("-of", "--output_file")
+	coverage_args.add_argument("--min_depth", type=int, default=1)
+
+	c_group_input = coverage_args.add_mutually_exclusive_group()
+	c_group_input.add_argument("-sf", "--source_file")
+	c_group_input.add_argument("-fd", "--from_database", action="store_true")
+	# endregion
+
+	# region triangulate
+	triangulate_args = subparsers.add_parser("triangulate")
+	triangulate_args.set_defaults(func=find_triangulation_groups.find_triangulation_groups)
+
+	triangulate_args.add_argument("-of", "--output_file")
+	triangulate_args.add_argument("--min_size", type=int, default=3)
 
+	t_group_input = triangulate_args.add_mutually_exclusive_group()
+	t_group_input.add_argument("-sf", "--source_file")
+	t_group_input.add_argument("-fd", "--from_database", action="store_true")
 	# endregion
 
 	# are there enough arguments?
@@ -136,10 +179,14 @@ delete-project
 list-projects
 current-project
 checkout
+migrate-database
+compact-database
 parse-matches
 parse-segments
 parse-shared
-find-intersections"""
+find-intersections
+coverage
+triangulate"""
 )
 		return
 
@@ -150,7 +197,9 @@ find-intersections"""
 		"parse-matches",
 		"parse-segments",
 		"parse-shared",
-		"find-intersections"]:
+		"find-intersections",
+		"coverage",
+		"triangulate"]:
 
 		save_command(os.getcwd(), sys.argv)
 
@@ -1,6 +1,7 @@
 from enum import Enum, IntEnum
 
 from genetic_genealogy.helper import lower_no_whitespace
+from genetic_genealogy.parsers.records import get_record_type, parse_value
 
 
 class SourceEnum(Enum):
@@ -24,6 +25,24 @@ class FormatEnum(IntEnum):
 		"""Returns the names of all the enum values in a list ordered by their values."""
 		return [item.name for item in cls]
 
+	@classmethod
+	def create_record(cls, values=None):
+		"""Creates a record of this format from values ordered as the columns, by default all the values are empty.
+		The record can be used as a dict keyed by the values of this enum."""
+		return get_record_type(cls)(values)
+
+	@classmethod
+	def column_types(cls) -> dict:
+		"""Returns a dict of types (int or float) of the columns, whose values are not strings.
+		Values of these columns are converted when records are loaded and formatted back when they are saved,
+		all the other columns are strings."""
+		return {}
+
+	@classmethod
+	def parse_value(cls, column, value):
+		"""Converts the string value of the given column to the type of the column."""
+		return parse_value(value, cls.column_types().get(column, str))
+
 	@classmethod
 	def comparison_key(cls, source: SourceEnum = None):
 		"""Returns all the values in this enum class that
@@ -76,6 +95,11 @@ class MatchFormatEnum(FormatEnum):
 
 		return [cls.person_id]
 
+	@classmethod
+	def column_types(cls):
+		# centimorgan columns stay strings, the sources write e.g. "No Match" or "7 cM" into them
+		return {cls.person_id: int}
+
 	person_id = 0
 	person_name = 1
 	source = 2
@@ -112,6 +136,19 @@ class SegmentFormatEnum(FormatEnum):
 			cls.end
 		]
 
+	@classmethod
+	def column_types(cls):
+		# chromosome ids stay strings, e.g. X
+		return {
+			cls.segment_id: int,
+			cls.person_id: int,
+			cls.start: int,
+			cls.end: int,
+			cls.length_cm: float,
+			cls.snps: int,
+			cls.density: float
+		}
+
 	segment_id = 0
 	person_id = 1
 	person_name = 2
@@ -124,6 +161,24 @@ class SegmentFormatEnum(FormatEnum):
 	density = 9
 
 
+class SegmentShardFormatEnum(FormatEnum):
+	"""This class defines the format of the manifest of the sharded segment database.
+	Each row describes the csv file (shard) holding the segments of one chromosome. The size of the file,
+	the number of segments and the largest segment id are the ones of the last save.
+	The segment_id_ranges are ranges of ids of the segments in the shard (e.g. "1-540 2778-2801")."""
+
+	@classmethod
+	def column_types(cls):
+		return {cls.size: int, cls.segment_count: int, cls.largest_segment_id: int}
+
+	chromosome_id = 0
+	file_name = 1
+	size = 2
+	segment_count = 3
+	largest_segment_id = 4
+	segment_id_ranges = 5
+
+
 class SharedMatchesFormatEnum(FormatEnum):
 	"""This class defines the format of parsed shared matches data."""
 
@@ -140,6 +195,10 @@ class SharedMatchesFormatEnum(FormatEnum):
 class SegmentIntersectionFormatEnum(FormatEnum):
 	"""This class defines the format of segment intersection data."""
 
+	@classmethod
+	def column_types(cls):
+		return {column: int for column in cls}
+
 	person_id_1 = 0
 	person_id_2 = 1
 	segment_1_id = 2
@@ -149,6 +208,36 @@ class SegmentIntersectionFormatEnum(FormatEnum):
 	length_snp = 6
 
 
+class CoverageFormatEnum(FormatEnum):
+	"""This class defines the format of chromosome coverage data.
+	Each row represents a region covered by segments of the same number of matches."""
+
+	@classmethod
+	def column_types(cls):
+		return {cls.start: int, cls.end: int, cls.depth: int}
+
+	chromosome_id = 0
+	start = 1
+	end = 2
+	depth = 3
+
+
+class TriangulationGroupFormatEnum(FormatEnum):
+	"""This class defines the format of triangulation groups.
+	Each row represents a group of matches, whose segments all overlap the common region.
+	The person_ids are separated by spaces."""
+
+	@classmethod
+	def column_types(cls):
+		return {cls.start: int, cls.end: int, cls.person_count: int}
+
+	chromosome_id = 0
+	start = 1
+	end = 2
+	person_count = 3
+	person_ids = 4
+
+
 class ClusterFormatEnum(FormatEnum):
 	"""This class defines the format of clusters data."""
 
@@ -158,6 +247,10 @@ class ClusterFormatEnum(FormatEnum):
 
 
 class PrimaryMatchesEnum(FormatEnum):
+	@classmethod
+	def column_types(cls):
+		return {cls.person_id: int}
+
 	person_id = 0
 	path = 1
 
@@ -212,14 +305,6 @@ class InputFormatEnum(str, Enum):
 
 		return False
 
-	@classmethod
-	def get_mapped_column_name(cls, source_column_name):
-		"""Gets the corresponding column name defined by this format."""
-		if source_column_name in cls.mapping().keys():
-			return cls.mapping()[source_column_name]
-		else:
-			return None
-
 	@classmethod
 	def get_source_id(cls) -> SourceEnum:
 		raise NotImplementedError()
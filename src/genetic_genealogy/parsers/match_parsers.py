@@ -3,9 +3,10 @@ import io
 import sys
 from abc import ABC, abstractmethod
 
-from genetic_genealogy.databases.match_database import CSVMatchDatabase, CSVHelper
+from genetic_genealogy.databases.match_database import create_match_database, CSVHelper
 from genetic_genealogy.exit_codes import ExitCodes
 from genetic_genealogy.parsers.formats import FTDNAMatchFormatEnum, MatchFormatEnum, GEDmatchMatchFormatEnum
+from genetic_genealogy.parsers.row_transformer import RowTransformer
 from genetic_genealogy.helper import one_space
 
 
@@ -47,11 +48,20 @@ class MatchParser(Parser, ABC):
 	def _output_format(cls):
 		return MatchFormatEnum
 
+	@classmethod
+	def create_row_transformer(cls, header):
+		"""Compiles the transformer of rows of the input format with the given header into records of the output format."""
+		return RowTransformer(
+			cls._input_format(), cls._output_format(), header,
+			normalizer=one_space,
+			constants={cls._output_format().source: cls._input_format().format_name()}
+		)
+
 	@classmethod
 	@abstractmethod
-	def parse_non_id_columns(cls, record) -> dict:
-		"""Parses all columns that are not defined by this application (all except for id)
-		and therefore does not require database access."""
+	def parse_non_id_columns(cls, transformer: RowTransformer, row: list):
+		"""Parses all columns of the row that are not defined by this application (all except for id)
+		and therefore does not require database access. Returns a record of the output format."""
 		pass
 
 	def parse(self, filename: str = None) -> None:
@@ -60,7 +70,7 @@ class MatchParser(Parser, ABC):
 		Checks for the correct format."""
 
 		# create and load the database
-		existing_records = CSVMatchDatabase()
+		existing_records = create_match_database()
 		existing_records.load()
 
 		self._new_matches = []
@@ -69,11 +79,11 @@ class MatchParser(Parser, ABC):
 		try:
 			if filename is None:
 				input_stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8-sig')
-				self._parse_from_dict_reader(csv.DictReader(input_stream), existing_records)
+				self._parse_from_reader(csv.reader(input_stream), existing_records)
 
 			else:
-				with open(filename, 'r', encoding="utf-8-sig") as input_file:
-					self._parse_from_dict_reader(csv.DictReader(input_file), existing_records)
+				with CSVHelper.open_text(filename) as input_file:
+					self._parse_from_reader(csv.reader(input_file), existing_records)
 
 		except FileNotFoundError:
 			print("The source file was not found.")
@@ -86,23 +96,27 @@ class MatchParser(Parser, ABC):
 		if len(self._new_matches) > 0:
 			existing_records.save()
 
-	def _parse_from_dict_reader(self, reader, existing_records):
-		"""Parses every record in the given reader,
+	def _parse_from_reader(self, reader, existing_records):
+		"""Parses every row in the given csv reader,
 		compares it to the existing_records database.
-		Check if the reader is of the correct format."""
+		Check if the header of the reader is of the correct format."""
+		header = next(reader, None)
 
 		# check if the file is in the correct format
-		if not self._input_format().validate_format(reader.fieldnames):
+		if not self._input_format().validate_format(header):
 			print("Wrong matches file format.")
 			exit(ExitCodes.wrong_input_format)
 
-		# replace string fieldnames with enum
-		reader.fieldnames = CSVHelper.get_strenum_fieldnames(self._input_format(), reader.fieldnames)
+		transformer = self.create_row_transformer(header)
 
-		# for every record in the reader, parse it into the correct format and store it in the self.__result list
-		for record in reader:
-			# create a new dict for the record and fill it with non-id columns
-			output_record = self.parse_non_id_columns(record)
+		# for every row in the reader, parse it into the correct format and store it in the self.__result list
+		for row in reader:
+			# skip empty lines
+			if not row:
+				continue
+
+			# create a new record for the row and fill it with non-id columns
+			output_record = self.parse_non_id_columns(transformer, row)
 
 			# get ID or create a new one
 			record_id = existing_records.get_id(output_record, self._input_format().get_source_id())
@@ -143,42 +157,34 @@ class FTDNAMatchParser(MatchParser):
 		return FTDNAMatchFormatEnum
 
 	@classmethod
-	def __create_name(cls, row: dict) -> str:
+	def create_row_transformer(cls, header):
+		# values from FamilyTreeDNA are copied as they are
+		return RowTransformer(
+			cls._input_format(), cls._output_format(), header,
+			constants={cls._output_format().source: cls._input_format().format_name()}
+		)
+
+	@classmethod
+	def __create_name(cls, transformer: RowTransformer, row: list) -> str:
 		"""Create unified name from name columns."""
 
 		# these values will be used for creating name
 		name = [
-			row[cls._input_format().first_name],
-			row[cls._input_format().middle_name],
-			row[cls._input_format().last_name]
+			transformer.get(row, cls._input_format().first_name),
+			transformer.get(row, cls._input_format().middle_name),
+			transformer.get(row, cls._input_format().last_name)
 		]
 
 		# delete additional spaces and return
 		return one_space(" ".join(name))
 
 	@classmethod
-	def parse_non_id_columns(cls, record: dict) -> dict:
-
-		output_record = {}
-		for index in cls._output_format():
-			output_record[index] = ""
-
-		# add genetic_genealogy name
-		output_record[cls._output_format().source] = cls._input_format().format_name()
+	def parse_non_id_columns(cls, transformer: RowTransformer, row: list):
+		# copy all relevant existing items from row to output record
+		output_record = transformer.transform(row)
 
 		# create name and add it into result row
-		output_record[cls._output_format().person_name] = cls.__create_name(record)
-
-		# copy all relevant existing items from record to output record
-		for input_column_name in record.keys():
-			# not all columns of input format must be present
-			item = record[input_column_name]
-
-			output_column = cls._input_format().get_mapped_column_name(input_column_name)
-			# output_column is of MatchFormatEnum type -> is int if is not none
-
-			if output_column is not None:
-				output_record[output_column] = item
+		output_record[cls._output_format().person_name] = cls.__create_name(transformer, row)
 
 		return output_record
 
@@ -190,25 +196,9 @@ class GEDmatchMatchParser(MatchParser):
 		return GEDmatchMatchFormatEnum
 
 	@classmethod
-	def parse_non_id_columns(cls, record) -> dict:
-		output_record = {}
-		for index in MatchFormatEnum:
-			output_record[index] = ""
-
-		# add genetic_genealogy name
-		output_record[MatchFormatEnum.source] = cls._input_format().format_name()
-
-		# copy all relevant existing items from record to output record
-		for input_column_name in record.keys():
-			item = record[input_column_name]
-
-			output_column = cls._input_format().get_mapped_column_name(input_column_name)
-			# output_column is of MatchFormatEnum type -> is int if is not none
-
-			if output_column is not None:
-				output_record[output_column] = " ".join(item.split())
-
-		return output_record
+	def parse_non_id_columns(cls, transformer: RowTransformer, row: list):
+		# copy all relevant existing items from row to output record, words are divided by one space
+		return transformer.transform(row)
 
 	def print_message(self) -> None:
 		if len(self._new_matches) == 0:
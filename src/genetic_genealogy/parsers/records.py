@@ -0,0 +1,199 @@
+class Record:
+	"""Base class of records (rows) of the application defined formats.
+
+	Record classes are created from the format enums by get_record_type, every column of the format
+	is stored in a slot named after it. Values can be accessed as attributes (record.start)
+	or by the format values (record[SegmentFormatEnum.start]) the same way as in dicts keyed by the format,
+	so records can be used in place of such dicts. A record takes several times less memory than a dict.
+
+	Values of columns typed by the format (e.g. int ids and positions) are held as native values,
+	they are converted from strings once by from_strings and formatted back by to_strings."""
+
+	__slots__ = ()
+
+	# the format and the names of its columns ordered by their values, set in the created classes
+	_format = None
+	_columns = ()
+
+	# (name, converter) pairs of the columns, which are not strings, set in the created classes
+	_conversions = ()
+
+	def __init__(self, values=None):
+		"""Creates a record from values ordered as the format columns,
+		missing values are empty strings, values over the number of columns are ignored."""
+		columns = self._columns
+
+		if values is None:
+			values = ()
+		elif len(values) == len(columns):
+			for name, value in zip(columns, values):
+				setattr(self, name, value)
+			return
+
+		for index, name in enumerate(columns):
+			setattr(self, name, values[index] if index < len(values) else "")
+
+	@classmethod
+	def from_strings(cls, values) -> "Record":
+		"""Creates a record from string values (e.g. a csv row) ordered as the format columns,
+		values of the typed columns are converted, empty values become None.
+		Raises ValueError if a value cannot be converted."""
+		record = cls(values)
+
+		for name, converter in cls._conversions:
+			setattr(record, name, converter(getattr(record, name)))
+
+		return record
+
+	def to_strings(self) -> list:
+		"""Returns the values formatted as strings ordered as the format columns, None values are empty."""
+		return [format_value(getattr(self, name)) for name in self._columns]
+
+	def __getitem__(self, column):
+		return getattr(self, self._columns[column])
+
+	def __setitem__(self, column, value):
+		setattr(self, self._columns[column], value)
+
+	def __contains__(self, column):
+		# columns are the int values of the format, any other key (e.g. a column name) is not in the record
+		return isinstance(column, int) and 0 <= column < len(self._columns)
+
+	def __iter__(self):
+		return iter(self._format)
+
+	def __len__(self):
+		return len(self._columns)
+
+	def __eq__(self, other):
+		return type(self) is type(other) and self.values() == other.values()
+
+	def __repr__(self):
+		return type(self).__name__ + "(" + repr(self.values()) + ")"
+
+	def get(self, column, default=None):
+		"""Returns the value of the column, or default if the format has no such column."""
+		if column not in self:
+			return default
+		return self[column]
+
+	def keys(self) -> list:
+		"""Returns the columns of the format."""
+		return list(self._format)
+
+	def values(self) -> list:
+		"""Returns the values ordered as the format columns."""
+		return [getattr(self, name) for name in self._columns]
+
+	def items(self) -> list:
+		"""Returns (column, value) pairs ordered as the format columns."""
+		return list(zip(self._format, self.values()))
+
+	def copy(self) -> "Record":
+		return type(self)(self.values())
+
+
+class _ParsedInt(int):
+	"""Int parsed from a text, which would be written differently by str (e.g. 007),
+	the text is kept, so that the value is written back exactly as it was read."""
+
+	def __new__(cls, text):
+		value = super().__new__(cls, text)
+		value.text = text
+		return value
+
+	def __reduce__(self):
+		return _ParsedInt, (self.text,)
+
+	def __str__(self):
+		return self.text
+
+
+def _to_int(value):
+	if value is None or value == "":
+		return None
+	if isinstance(value, int):
+		return value
+
+	parsed = int(value)
+	if type(value) is not str or str(parsed) == value:
+		return parsed
+
+	return _ParsedInt(value)
+
+
+class _ParsedFloat(float):
+	"""Float parsed from a text, which would be written differently by str (e.g. 7 or 7.50),
+	the text is kept, so that the value is written back exactly as it was read."""
+
+	__slots__ = ("text",)
+
+	def __new__(cls, text):
+		value = super().__new__(cls, text)
+		value.text = text
+		return value
+
+	def __reduce__(self):
+		return _ParsedFloat, (self.text,)
+
+	def __str__(self):
+		return self.text
+
+
+def _to_float(value):
+	if value is None or value == "":
+		return None
+	if isinstance(value, float):
+		return value
+
+	parsed = float(value)
+	if type(value) is not str or str(parsed) == value:
+		return parsed
+
+	return _ParsedFloat(value)
+
+
+# converters of the column types to values of the type
+_converters = {int: _to_int, float: _to_float}
+
+
+def parse_value(value, value_type):
+	"""Converts the string value to the value_type (str, int or float), empty values of int and float are None.
+	Raises ValueError if the value cannot be converted."""
+	if value_type is str:
+		return value
+	return _converters[value_type](value)
+
+
+def format_value(value) -> str:
+	"""Formats a value of a record as a string. None is an empty string,
+	parsed numbers are written in their original text, so that e.g. 7 stays 7, 7.0 stays 7.0 and 007 stays 007."""
+	if value is None:
+		return ""
+	return str(value)
+
+
+# record classes already created for the formats
+_record_types = {}
+
+
+def get_record_type(record_format) -> type:
+	"""Returns the record class of the given format enum, the class is created only once for every format.
+	Types of the columns are read from the column_types classmethod of the format, if it has one."""
+	if record_format not in _record_types.keys():
+		columns = tuple(column.name for column in record_format)
+
+		column_types = record_format.column_types() if hasattr(record_format, "column_types") else {}
+		conversions = tuple(
+			(column.name, _converters[column_types[column]])
+			for column in record_format
+			if column_types.get(column, str) is not str
+		)
+
+		_record_types[record_format] = type(
+			record_format.__name__.replace("FormatEnum", "") + "Record",
+			(Record,),
+			{"__slots__": columns, "_format": record_format, "_columns": columns, "_conversions": conversions}
+		)
+
+	return _record_types[record_format]
@@ -0,0 +1,100 @@
+from genetic_genealogy.helper import lower_no_whitespace
+from genetic_genealogy.parsers.records import get_record_type, parse_value
+
+
+# dicts of the input formats, which map the names of columns without whitespaces in lowercase to the columns
+_column_lookups = {}
+
+
+def _get_column_lookup(input_format) -> dict:
+	"""Returns the dict mapping the simplified names of the columns of the input_format to the columns,
+	the dict is created only once for every format."""
+	if input_format not in _column_lookups.keys():
+		_column_lookups[input_format] = {lower_no_whitespace(column): column for column in input_format}
+
+	return _column_lookups[input_format]
+
+
+class RowTransformer:
+	"""Transforms raw rows of an input format, as read by csv.reader, into records of an output format.
+
+	The transformer is compiled once for the header of the input file: the mapping of the input format
+	is resolved to a list of (input index, output index, normalizer) steps, so transforming a row
+	only copies the mapped values and does not look up any column names.
+	The normalizer of a step is applied to the raw value, values of typed output columns
+	(see FormatEnum.column_types) are then converted to the type of the column."""
+
+	def __init__(self, input_format, output_format, header, normalizer=None, constants=None, mapping=None):
+		"""Compiles the transformer for the header of the input file.
+		The normalizer is applied to every mapped value, if it is None, values are copied as they are.
+		The constants are values of output columns, which are the same for all rows (e.g. the source).
+		The mapping of the input format is used, unless other mapping is given."""
+		self.input_format = input_format
+		self.output_format = output_format
+
+		self.__record_type = get_record_type(output_format)
+
+		if mapping is None:
+			mapping = input_format.mapping()
+
+		# indexes of the input columns found in the header, unknown columns are skipped
+		lookup = _get_column_lookup(input_format)
+		self.__indexes = {}
+		for index, name in enumerate(header):
+			column = lookup.get(lower_no_whitespace(name))
+			if column is not None:
+				self.__indexes[column] = index
+
+		self.__width = len(header)
+
+		column_types = output_format.column_types()
+		self.steps = [
+			(index, mapping[column], self.__compile_normalizer(normalizer, column_types.get(mapping[column], str)))
+			for column, index in self.__indexes.items()
+			if column in mapping
+		]
+
+		# values of a new record, all the values that are not mapped are empty
+		self.__template = [""] * len(output_format)
+		for column, value in (constants or {}).items():
+			self.__template[column] = value
+
+	@staticmethod
+	def __compile_normalizer(normalizer, value_type):
+		"""Returns the function, which is applied to raw values of the output column of the given type."""
+		if value_type is str:
+			return normalizer
+
+		if normalizer is None:
+			return lambda value: parse_value(value, value_type)
+
+		return lambda value: parse_value(normalizer(value), value_type)
+
+	def get(self, row: list, column) -> str:
+		"""Returns the raw value of the input column in the row.
+		If the column is not present in the header or the row is too short, returns an empty string."""
+		index = self.__indexes.get(column)
+
+		if index is None or index >= len(row):
+			return ""
+
+		return row[index]
+
+	def fill(self, row: list, output) -> None:
+		"""Writes the mapped values of the row into the output record or list.
+		Raises ValueError if a value of a typed column cannot be converted."""
+		if len(row) < self.__width:
+			# missing values at the end of the row are empty
+			row = row + [""] * (self.__width - len(row))
+
+		for input_index, output_index, normalizer in self.steps:
+			value = row[input_index]
+			output[output_index] = value if normalizer is None else normalizer(value)
+
+	def transform(self, row: list):
+		"""Returns a new record of the output format filled with the mapped values of the row and the constants.
+		Raises ValueError if a value of a typed column cannot be converted."""
+		values = self.__template.copy()
+		self.fill(row, values)
+
+		return self.__record_type(values)
@@ -1,15 +1,21 @@
 import csv
 import io
+import os
+import re
 import sys
 from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator
 
 from genetic_genealogy.csv_io import CSVHelper
-from genetic_genealogy.databases.match_database import CSVMatchDatabase
-from genetic_genealogy.databases.segment_database import CSVSegmentDatabase
+from genetic_genealogy.databases.match_database import MatchDatabase, create_match_database
+from genetic_genealogy.databases.segment_database import create_segment_database
 from genetic_genealogy.exit_codes import ExitCodes
 from genetic_genealogy.parsers.formats import FTDNASegmentFormatEnum, ListCSV_GEDmatchSegmentFormatEnum, \
 	SegmentSearch_GEDmatchSegmentFormatEnum, SegmentFormatEnum
 from genetic_genealogy.parsers.match_parsers import Parser
+from genetic_genealogy.parsers.row_transformer import RowTransformer
 from genetic_genealogy.helper import one_space
 
 
@@ -26,12 +32,23 @@ class SegmentParser(Parser, ABC):
 	def _output_format(cls):
 		return SegmentFormatEnum
 
-	def parse(self, filename: str) -> None:
+	# approximate size of the parts of the source file normalized by one job, in bytes
+	__chunk_size = 1 << 22
+	# size of the blocks, in which the source file is read when the quotes before the chunk bounds are counted
+	__block_size = 1 << 20
+	# quotes and newlines, which end rows outside quoted fields
+	__row_end = re.compile(b'["\n]')
+
+	def parse(self, filename: str, jobs=1) -> None:
+		"""Parses segments in the given filename, if filename is not given, reads from standard input.
+		If jobs is greater than 1, the rows of the file are normalized in parallel by a pool of that many processes,
+		the people are identified and the ids are given in this process in the order of the file,
+		so the result is the same as with one job. Standard input is always parsed by one job."""
 		# create and load databases
-		existing_matches = CSVMatchDatabase()
+		existing_matches = create_match_database()
 		existing_matches.load()
 
-		existing_segments = CSVSegmentDatabase()
+		existing_segments = create_segment_database()
 		existing_segments.load()
 
 		self._new_segments_found = False
@@ -39,11 +56,15 @@ class SegmentParser(Parser, ABC):
 		try:
 			if filename is None:
 				input_stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8-sig')
-				self._parse_from_dict_reader(csv.DictReader(input_stream), existing_matches, existing_segments)
+				self._parse_from_reader(csv.reader(input_stream), existing_matches, existing_segments)
 
 			else:
-				with open(filename, 'r', encoding="utf-8-sig") as input_file:
-					self._parse_from_dict_reader(csv.DictReader(input_file), existing_matches, existing_segments)
+				if jobs > 1:
+					self._parse_in_chunks(filename, jobs, existing_matches, existing_segments)
+
+				else:
+					with CSVHelper.open_text(filename) as input_file:
+						self._parse_from_reader(csv.reader(input_file), existing_matches, existing_segments)
 
 		except FileNotFoundError:
 			print("The source file was not found.")
@@ -55,79 +76,271 @@ class SegmentParser(Parser, ABC):
 		if self._new_segments_found:
 			existing_segments.save()
 
+	@classmethod
+	def create_row_transformer(cls, header):
+		"""Compiles the transformer of rows of the input format with the given header into records of the output format.
+		SOURCE name is the same for all the rows, MAPPED FIELDS are words divided by one space."""
+		return RowTransformer(
+			cls._input_format(), cls._output_format(), header,
+			normalizer=one_space,
+			constants={cls._output_format().source: cls._input_format().format_name()}
+		)
+
 	@classmethod
 	@abstractmethod
-	def _find_person_id(cls, match_database: CSVMatchDatabase, record: dict):
-		"""Finds person ID for the giver record in the match_database,
+	def _find_person_id(cls, match_database: MatchDatabase, identifier: str):
+		"""Finds person ID for the given person identifier (words divided by one space) in the match_database,
 		returns it as int.
 		If no ID is found, returns None."""
 		pass
 
+	@classmethod
+	def _normalize_rows(cls, header, rows) -> list:
+		"""Normalizes the rows of the input format with the given header, does not require database access.
+		Returns a list of (identifier, person identifier divided by one space, values of the output record) tuples,
+		values are None if they cannot be converted."""
+		transformer = cls.create_row_transformer(header)
+		result = []
+
+		for row in rows:
+			# skip empty lines
+			if not row:
+				continue
+
+			identifier = transformer.get(row, cls._input_format().person_identifier)
+
+			try:
+				values = transformer.transform(row).values()
+			except ValueError:
+				values = None
+
+			result.append((identifier, one_space(identifier), values))
+
+		return result
+
 	@abstractmethod
 	def print_message(self) -> None:
 		pass
 
-	def _parse_from_dict_reader(self, reader, existing_matches, existing_segments):
-		"""Parses records from the given dict_reader.
+	def _parse_from_reader(self, reader, existing_matches, existing_segments):
+		"""Parses rows from the given csv reader.
 		Appends the parsed records to _result."""
+		header = next(reader, None)
 
 		# check if the file is in the correct format
-		if not self._input_format().validate_format(reader.fieldnames):
+		if not self._input_format().validate_format(header):
 			print("Wrong segment file format.")
 			exit(ExitCodes.wrong_input_format)
 
-		reader.fieldnames = CSVHelper.get_strenum_fieldnames(self._input_format(), reader.fieldnames)
+		transformer = self.create_row_transformer(header)
+
+		for row in reader:
+			# skip empty lines
+			if not row:
+				continue
+
+			identifier = transformer.get(row, self._input_format().person_identifier)
 
-		for record in reader:
-			person_id = self._find_person_id(existing_matches, record)
+			person_id = self._find_person_id(existing_matches, one_space(identifier))
 			if person_id is None:
-				if record[self._input_format().person_identifier] not in self._unidentified_identifiers:
-					self._unidentified_identifiers.append(record[self._input_format().person_identifier])
+				if identifier not in self._unidentified_identifiers:
+					self._unidentified_identifiers.append(identifier)
 				continue
 
-			# person exists, create the OUTPUT RECORD
-			output_segment = {}
-			for index in self._output_format():
-				output_segment[index] = ""
+			# person exists, create the OUTPUT RECORD with the SOURCE name and all the MAPPED FIELDS
+			try:
+				output_segment = transformer.transform(row)
+			except ValueError:
+				print("Wrong segment file format.")
+				exit(ExitCodes.wrong_input_format)
 
-			# add SOURCE name
-			output_segment[self._output_format().source] = self._input_format().format_name()
+			self._add_segment(output_segment, person_id, existing_matches, existing_segments)
 
-			# add NAME, ID to result
-			output_segment[self._output_format().person_name] = existing_matches.get_record_from_id(person_id)[
-				existing_matches.format.person_name]
-			output_segment[self._output_format().person_id] = person_id
+	def _parse_in_chunks(self, filename, jobs, existing_matches, existing_segments):
+		"""Parses rows of the given file, which is split into chunks of whole lines normalized by a pool of processes.
+		The workers read the chunks of uncompressed files themselves, compressed files are decompressed
+		in this process and the chunks of lines are passed to the workers.
+		The normalized rows are identified and added in the order of the file.
+		Appends the parsed records to _result."""
+		# at most this many chunks are normalized or wait for being added at once
+		window = jobs * 2
 
-			# copy all REMAINING existing information = MAPPED FIELDS
-			for input_column_name in reader.fieldnames:
-				item = record[input_column_name]
+		with ProcessPoolExecutor(max_workers=jobs) as executor:
+			if CSVHelper.is_compressed(filename):
+				with CSVHelper.open_text(filename) as input_file:
+					header = self.__read_header(self.__read_row_text(input_file.readline))
 
-				output_column = self._input_format().get_mapped_column_name(input_column_name)
-				# output_column is of SegmentFormatEnum type -> is int if is not none
+					chunks = self.__map_in_order(executor, _normalize_text, (
+						(type(self), header, text) for text in self.__read_text_chunks(input_file)), window)
+					self.__add_chunks(chunks, existing_matches, existing_segments)
 
-				if output_column is not None:
-					output_segment[output_column] = " ".join(item.split())
+			else:
+				with open(filename, 'rb') as input_file:
+					header = self.__read_header(self.__read_row_text(input_file.readline).decode("utf-8-sig"))
+					bounds = self.__get_chunk_bounds(input_file, jobs)
 
-			# get and add SEGMENT ID
-			segment_id = existing_segments.get_id(
-				output_segment,
-				self._input_format().get_source_id(),
-				self._output_format().segment_id
-			)
+				chunks = self.__map_in_order(executor, _normalize_chunk, (
+					(type(self), header, filename, begin, end) for begin, end in zip(bounds[:-1], bounds[1:])), window)
+				self.__add_chunks(chunks, existing_matches, existing_segments)
 
-			if segment_id is None:
-				# no match found - create new id and add to database
-				segment_id = existing_segments.get_new_id()
-				output_segment[self._output_format().segment_id] = segment_id
+	def __read_header(self, text) -> list:
+		"""Returns the header read from the text of the first row of the file, checks if the file is in the correct format."""
+		header = next(csv.reader(io.StringIO(text, newline=None)), None)
 
-				# take note of newly found segment
-				self._new_segments_found = True
-				existing_segments.add_record(output_segment)
+		if not self._input_format().validate_format(header):
+			print("Wrong segment file format.")
+			exit(ExitCodes.wrong_input_format)
 
-			else:
-				output_segment[self._output_format().segment_id] = segment_id
+		return header
+
+	@staticmethod
+	def __map_in_order(executor, function, arguments, window) -> Iterator:
+		"""Yields the results of the function called by the executor with the argument tuples, in their order.
+		At most window calls are submitted before their results are yielded,
+		so the arguments are only read as the results are consumed."""
+		pending = deque()
+
+		for function_arguments in arguments:
+			pending.append(executor.submit(function, *function_arguments))
+
+			if len(pending) >= window:
+				yield pending.popleft().result()
+
+		while len(pending) > 0:
+			yield pending.popleft().result()
 
-			self._result.append(output_segment)
+	@staticmethod
+	def __read_row_text(readline):
+		"""Reads the lines of one csv row by the readline function of a text or binary file.
+		A row continues on the next line, while it has an odd number of quotes (a quoted field holds a newline)."""
+		text = readline()
+		quote = '"' if isinstance(text, str) else b'"'
+
+		while text.count(quote) % 2 == 1:
+			line = readline()
+			if len(line) == 0:
+				break
+			text += line
+
+		return text
+
+	@classmethod
+	def __read_text_chunks(cls, input_file) -> Iterator:
+		"""Yields the rest of the opened text input_file in chunks of whole rows."""
+		while True:
+			lines = input_file.readlines(cls.__chunk_size)
+			if len(lines) == 0:
+				return
+
+			# the last row may continue on the next lines
+			quoted = sum(line.count('"') for line in lines) % 2 == 1
+			while quoted:
+				line = input_file.readline()
+				if len(line) == 0:
+					break
+				lines.append(line)
+				quoted = quoted != (line.count('"') % 2 == 1)
+
+			yield "".join(lines)
+
+	def __add_chunks(self, chunks, existing_matches, existing_segments):
+		"""Identifies the rows of the normalized chunks and adds them, see _normalize_rows."""
+		for chunk in chunks:
+			for identifier, person_key, values in chunk:
+				person_id = self._find_person_id(existing_matches, person_key)
+				if person_id is None:
+					if identifier not in self._unidentified_identifiers:
+						self._unidentified_identifiers.append(identifier)
+					continue
+
+				if values is None:
+					print("Wrong segment file format.")
+					exit(ExitCodes.wrong_input_format)
+
+				self._add_segment(
+					self._output_format().create_record(values), person_id, existing_matches, existing_segments)
+
+	@classmethod
+	def __get_chunk_bounds(cls, input_file, jobs) -> list:
+		"""Returns the offsets of the chunks of the rest of the opened binary input_file,
+		each chunk ends at the end of a row. There are at least as many chunks as jobs, if the file has enough rows.
+
+		A newline ends a row only if it is not in a quoted field, that is if there is an even number
+		of quotes before it. The quotes are counted in blocks read from the file."""
+		begin = input_file.tell()
+		size = os.fstat(input_file.fileno()).st_size
+
+		count = max(jobs, (size - begin) // cls.__chunk_size + 1)
+		bounds = [begin]
+
+		# position up to which the quotes were counted and whether it is in a quoted field
+		position = begin
+		quoted = False
+
+		for i in range(1, count):
+			target = begin + (size - begin) * i // count
+			if target <= bounds[-1]:
+				continue
+
+			while position < target:
+				input_file.seek(position)
+				block = input_file.read(min(target - position, cls.__block_size))
+				quoted = quoted != (block.count(b'"') % 2 == 1)
+				position += len(block)
+
+			# move the bound to the beginning of the next row
+			while position < size:
+				input_file.seek(position)
+				block = input_file.read(cls.__block_size)
+
+				for match in cls.__row_end.finditer(block):
+					if match.group() == b'"':
+						quoted = not quoted
+					elif not quoted:
+						position += match.end()
+						break
+				else:
+					position += len(block)
+					continue
+
+				break
+
+			if position < size:
+				bounds.append(position)
+
+		if size > bounds[-1]:
+			bounds.append(size)
+
+		return bounds
+
+	def _add_segment(self, output_segment, person_id, existing_matches, existing_segments):
+		"""Adds the person to the parsed output_segment, finds the id of the segment
+		or adds it to the existing_segments as a new one. Appends the segment to _result."""
+		# add NAME, ID to result
+		output_segment[self._output_format().person_name] = existing_matches.get_record_from_id(person_id)[
+			existing_matches.format.person_name]
+		output_segment[self._output_format().person_id] = person_id
+
+		# get and add SEGMENT ID
+		segment_id = existing_segments.get_id(
+			output_segment,
+			self._input_format().get_source_id(),
+			self._output_format().segment_id
+		)
+
+		if segment_id is None:
+			# no match found - create new id and add to database
+			segment_id = existing_segments.get_new_id()
+			output_segment[self._output_format().segment_id] = segment_id
+
+			# take note of newly found segment
+			self._new_segments_found = True
+			existing_segments.add_record(output_segment)
+
+		else:
+			output_segment[self._output_format().segment_id] = segment_id
+
+		self._result.append(output_segment)
 
 
 class FTDNASegmentParser(SegmentParser):
@@ -138,21 +351,15 @@ class FTDNASegmentParser(SegmentParser):
 		return FTDNASegmentFormatEnum
 
 	@classmethod
-	def _find_person_id(cls, match_database: CSVMatchDatabase, record: dict) -> int:
-		name = cls.__create_name(record)
-		person = match_database.get_record_from_match_name(name)
+	def _find_person_id(cls, match_database: MatchDatabase, identifier: str) -> int:
+		# the identifier is the full name of the person
+		person = match_database.get_record_from_match_name(identifier)
 
 		if person is not None:
-			return int(person[match_database.format.person_id])
+			return person[match_database.format.person_id]
 
 		return None
 
-	@classmethod
-	def __create_name(cls, record: dict) -> str:
-		"""Returns the full name of the person in the record,
-		words are divided by one space."""
-		return one_space(record[cls._input_format().match_name])
-
 	def print_message(self) -> None:
 		"""Prints information if new segments were added to the database.
 		Prints names of all the people who were not identified based on their names, if any were not."""
@@ -171,11 +378,11 @@ class FTDNASegmentParser(SegmentParser):
 
 class GEDmatchSegmentParser(SegmentParser, ABC):
 	@classmethod
-	def _find_person_id(cls, match_database: CSVMatchDatabase, record: dict):
-		person = match_database.get_record_from_gedmatch_id\
-			(" ".join(record[cls._input_format().matched_kit].split()))
+	def _find_person_id(cls, match_database: MatchDatabase, identifier: str):
+		# the identifier is the kit number of the person
+		person = match_database.get_record_from_gedmatch_id(identifier)
 		if person is not None:
-			return int(person[match_database.format.person_id])
+			return person[match_database.format.person_id]
 
 		return None
 
@@ -206,3 +413,20 @@ class SegmentSearch_GEDmatchSegmentParser(GEDmatchSegmentParser):
 	@classmethod
 	def _input_format(cls):
 		return SegmentSearch_GEDmatchSegmentFormatEnum
+
+
+def _normalize_chunk(parser_type, header, filename, begin, end) -> list:
+	"""Normalizes the rows of the source file between the byte offsets begin and end by the given segment parser type,
+	see SegmentParser._normalize_rows. Runs in the worker processes of SegmentParser._parse_in_chunks."""
+	with open(filename, 'rb') as input_file:
+		input_file.seek(begin)
+		text = input_file.read(end - begin).decode("utf-8")
+
+	return _normalize_text(parser_type, header, text)
+
+
+def _normalize_text(parser_type, header, text) -> list:
+	"""Normalizes the rows in the text of whole lines by the given segment parser type,
+	see SegmentParser._normalize_rows. Runs in the worker processes of SegmentParser._parse_in_chunks."""
+	# newlines are translated the same way as when the file is read by one job
+	return parser_type._normalize_rows(header, csv.reader(io.StringIO(text, newline=None)))
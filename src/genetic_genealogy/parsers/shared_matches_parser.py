@@ -6,10 +6,12 @@ from abc import ABC, abstractmethod
 from genetic_genealogy.csv_io import CSVHelper
 from genetic_genealogy.exit_codes import ExitCodes
 from genetic_genealogy.helper import one_space
-from genetic_genealogy.parsers.match_parsers import CSVMatchDatabase, FTDNAMatchParser, Parser
+from genetic_genealogy.databases.match_database import create_match_database
+from genetic_genealogy.parsers.match_parsers import FTDNAMatchParser, Parser
 from genetic_genealogy.parsers.formats import SharedMatchesFormatEnum, FTDNAMatchFormatEnum, MatchFormatEnum, \
 	PrimaryMatchesEnum, \
 	GEDmatchMatchFormatEnum
+from genetic_genealogy.parsers.row_transformer import RowTransformer
 
 
 class SharedMatchesParser(Parser, ABC):
@@ -42,7 +44,7 @@ class SharedMatchesParser(Parser, ABC):
 				self._load_pm_from_dict_reader(csv.DictReader(input_stream))
 
 			else:
-				with open(csv_config_filename, 'r', encoding="utf-8-sig") as input_file:
+				with CSVHelper.open_text(csv_config_filename) as input_file:
 					self._load_pm_from_dict_reader(csv.DictReader(input_file))
 
 		except FileNotFoundError:
@@ -67,6 +69,13 @@ class SharedMatchesParser(Parser, ABC):
 				print("All primary matches must be identified by person_id.")
 				exit(ExitCodes.missing_data)
 
+			try:
+				# ids are compared with the ids from the match database, which are int
+				ID = self._primary_match_format.parse_value(self._primary_match_format.person_id, ID)
+			except ValueError:
+				print("Wrong config file format.")
+				exit(ExitCodes.wrong_input_format)
+
 			self._primary_matches[ID] = row[self._primary_match_format.path.name]
 
 	def parse(self, configuration_file=None):
@@ -83,12 +92,12 @@ class SharedMatchesParser(Parser, ABC):
 
 		self._load_primary_matches(configuration_file)
 
-		existing_matches = CSVMatchDatabase()
+		existing_matches = create_match_database()
 		existing_matches.load()
 
 		# for each person in primary matches, parse their file
 		for primary_match_id in self._primary_matches:
-			primary_match = existing_matches.get_record_from_id(int(primary_match_id))
+			primary_match = existing_matches.get_record_from_id(primary_match_id)
 
 			if primary_match is None:
 				self._primary_matches_not_found.append(primary_match_id)
@@ -97,24 +106,31 @@ class SharedMatchesParser(Parser, ABC):
 			primary_match_name = primary_match[MatchFormatEnum.person_name]
 
 			try:
-				with open(self._primary_matches[primary_match_id], 'r', encoding="utf-8-sig") as file:
-					reader = csv.DictReader(file)
+				with CSVHelper.open_text(self._primary_matches[primary_match_id]) as file:
+					reader = csv.reader(file)
+					header = next(reader, None)
 
-					reader.fieldnames = CSVHelper.get_strenum_fieldnames(self._input_format(), reader.fieldnames)
-
-					if not self._input_format().validate_format(reader.fieldnames):
+					if not self._input_format().validate_format(header):
 						print("Wrong matches file format.")
 						exit(ExitCodes.wrong_input_format)
 
+					transformer = self._create_row_transformer(header)
+
 					for row in reader:
+						# skip empty lines
+						if not row:
+							continue
+
 						# parse secondary match record - only part that is genetic_genealogy dependant
 						secondary_match_id, secondary_match_name = self._get_secondary_match_id_and_name(
 							existing_matches,
+							transformer,
 							row)
 
 						# if the person was not found in POIs matches, skip it, but add it to not found names
 						if secondary_match_id is None:
-							self._secondary_matches_not_found.append(row[self._input_format().person_identifier])
+							self._secondary_matches_not_found.append(
+								transformer.get(row, self._input_format().person_identifier))
 							continue
 
 						# if the two people are the same, skip the secondary one
@@ -136,7 +152,7 @@ class SharedMatchesParser(Parser, ABC):
 						output_row[self._output_format().name_2] = secondary_match_name
 
 						# genetic_genealogy specific - we do not have match statistics from FTDNA
-						self._fill_in_match_statistics(row, output_row)
+						self._fill_in_match_statistics(transformer, row, output_row)
 
 						self._result.append(output_row)
 
@@ -149,15 +165,23 @@ class SharedMatchesParser(Parser, ABC):
 				print("File could not be parsed.")
 				exit(ExitCodes.io_error)
 
+	@classmethod
 	@abstractmethod
-	def _get_secondary_match_id_and_name(self, existing_matches, input_row) -> (int, str):
+	def _create_row_transformer(cls, header) -> RowTransformer:
+		"""Compiles the transformer of rows of the input format with the given header,
+		which is passed to the source database specific methods."""
+		pass
+
+	@abstractmethod
+	def _get_secondary_match_id_and_name(
+			self, existing_matches, transformer: RowTransformer, input_row: list) -> (int, str):
 		"""Gets secondary match information from match database (existing_matches).
 		Returns the ID and name as a tuple of int and str.
 		Is source database specific."""
 		pass
 
 	@abstractmethod
-	def _fill_in_match_statistics(self, input_row, output_row) -> None:
+	def _fill_in_match_statistics(self, transformer: RowTransformer, input_row: list, output_row) -> None:
 		"""Gets match statistics from input row. Is source database specific."""
 		pass
 
@@ -192,8 +216,12 @@ class FTDNASharedMatchesParser(SharedMatchesParser):
 	def _input_format(cls):
 		return FTDNAMatchFormatEnum
 
-	def _get_secondary_match_id_and_name(self, existing_matches, input_row):
-		match = FTDNAMatchParser.parse_non_id_columns(input_row)
+	@classmethod
+	def _create_row_transformer(cls, header):
+		return FTDNAMatchParser.create_row_transformer(header)
+
+	def _get_secondary_match_id_and_name(self, existing_matches, transformer, input_row):
+		match = FTDNAMatchParser.parse_non_id_columns(transformer, input_row)
 		name = match[MatchFormatEnum.person_name]
 
 		secondary_match = existing_matches.get_record_from_match_name(name)
@@ -202,7 +230,7 @@ class FTDNASharedMatchesParser(SharedMatchesParser):
 
 		return None, name
 
-	def _fill_in_match_statistics(self, input_row, output_row) -> None:
+	def _fill_in_match_statistics(self, transformer, input_row, output_row) -> None:
 		# when data is from FamilyTreeDNA, we do not get information
 		# about shared centimorgans between the two other matches
 		return None
@@ -215,9 +243,18 @@ class GEDmatchSharedMatchesParser(SharedMatchesParser):
 	def _input_format(cls):
 		return GEDmatchMatchFormatEnum
 
-	def _get_secondary_match_id_and_name(self, existing_matches, input_row: dict):
-		kit_id = one_space(input_row[self._input_format().matched_kit])
-		name = one_space(input_row[self._input_format().matched_name])
+	@classmethod
+	def _create_row_transformer(cls, header):
+		# only the statistics of the shared match are mapped, the kit and the name are read by the transformer
+		return RowTransformer(
+			cls._input_format(), cls._output_format(), header,
+			normalizer=one_space,
+			mapping=cls._input_format().shared_matches_mapping()
+		)
+
+	def _get_secondary_match_id_and_name(self, existing_matches, transformer: RowTransformer, input_row: list):
+		kit_id = one_space(transformer.get(input_row, self._input_format().matched_kit))
+		name = one_space(transformer.get(input_row, self._input_format().matched_name))
 
 		match = existing_matches.get_record_from_gedmatch_id(kit_id)
 		if match is not None:
@@ -227,10 +264,7 @@ class GEDmatchSharedMatchesParser(SharedMatchesParser):
 		# secondary match was not found
 		return None, name
 
-	def _fill_in_match_statistics(self, input_row: dict, output_row: dict) -> None:
+	def _fill_in_match_statistics(self, transformer: RowTransformer, input_row: list, output_row) -> None:
 		"""Fill output row columns, that describe how much DNA
 		the primary match shares with the secondary match."""
-		mapping = self._input_format().shared_matches_mapping()
-		for index in input_row.keys():
-			if index in mapping:
-				output_row[mapping[index]] = one_space(input_row[index])
+		transformer.fill(input_row, output_row)
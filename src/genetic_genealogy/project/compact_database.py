@@ -0,0 +1,23 @@
+import argparse
+
+from genetic_genealogy.databases.match_database import create_match_database
+from genetic_genealogy.databases.segment_database import create_segment_database
+
+
+def compact_database(args):
+	"""Rewrites the whole match and segment databases of the current project.
+	New records are only appended to the csv databases, compaction writes them again from scratch."""
+
+	for database in [create_match_database(), create_segment_database()]:
+		database.load()
+		database.compact()
+
+	print("Databases were successfully compacted.")
+
+
+if __name__ == "__main__":
+	args_parser = argparse.ArgumentParser()
+
+	arguments = args_parser.parse_args()
+
+	compact_database(arguments)
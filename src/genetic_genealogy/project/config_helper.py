@@ -8,19 +8,93 @@ from genetic_genealogy.exit_codes import ExitCodes
 class ConfigHelper:
 	"""Class used for parsing configuration from global configuration file (settings.ini)."""
 
+	# types of storage of the match and segment databases,
+	# the sharded backend stores segments in csv files by chromosomes and matches in the csv database
+	database_backends = ["csv", "sqlite", "sharded"]
+
+	# compressions of the csv databases and the extensions added to their locations
+	database_compressions = {"none": "", "gzip": ".gz", "bz2": ".bz2", "xz": ".xz"}
+
 	@staticmethod
 	def get_match_database_location():
+		"""Returns the location of the csv match database, with the extension of the configured compression."""
 		project_config = ConfigHelper.__get_current_project_configuration()
 		current_proj_path = ConfigHelper.__get_current_project_path()
 
-		return os.path.join(current_proj_path, project_config['CSV_LOCATIONS']['match_database'])
+		return os.path.join(current_proj_path, project_config['CSV_LOCATIONS']['match_database']) \
+			+ ConfigHelper.get_database_compression()
 
 	@staticmethod
 	def get_segment_database_location():
+		"""Returns the location of the csv segment database, with the extension of the configured compression."""
+		project_config = ConfigHelper.__get_current_project_configuration()
+		current_proj_path = ConfigHelper.__get_current_project_path()
+
+		return os.path.join(current_proj_path, project_config['CSV_LOCATIONS']['segment_database']) \
+			+ ConfigHelper.get_database_compression()
+
+	@staticmethod
+	def get_database_backend() -> str:
+		"""Returns the type of storage of the match and segment databases, csv if it is not configured."""
+		project_config = ConfigHelper.__get_current_project_configuration()
+		backend = project_config.get("DATABASE", "backend", fallback="csv")
+
+		if backend not in ConfigHelper.database_backends:
+			print("Unknown database backend " + backend + " in the project configuration.")
+			exit(ExitCodes.wrong_arguments)
+
+		return backend
+
+	@staticmethod
+	def get_database_journal() -> bool:
+		"""Returns True if records added to the csv databases should be journaled until they are saved."""
+		project_config = ConfigHelper.__get_current_project_configuration()
+		return project_config.getboolean("DATABASE", "journal", fallback=False)
+
+	@staticmethod
+	def get_database_compression() -> str:
+		"""Returns the extension of the compression of the csv databases (e.g. .gz),
+		an empty string if they are not compressed, which is the default."""
+		project_config = ConfigHelper.__get_current_project_configuration()
+		compression = project_config.get("DATABASE", "compression", fallback="none")
+
+		if compression not in ConfigHelper.database_compressions.keys():
+			print("Unknown database compression " + compression + " in the project configuration.")
+			exit(ExitCodes.wrong_arguments)
+
+		return ConfigHelper.database_compressions[compression]
+
+	@staticmethod
+	def set_database_backend(backend) -> None:
+		"""Changes the type of storage of the match and segment databases in the current project configuration."""
+		project_config = ConfigHelper.__get_current_project_configuration()
+		current_proj_path = ConfigHelper.__get_current_project_path()
+
+		if "DATABASE" not in project_config:
+			project_config["DATABASE"] = {}
+		project_config["DATABASE"]["backend"] = backend
+
+		ConfigHelper.write_project_configuration_to_file(
+			project_config, os.path.join(current_proj_path, "settings.ini"))
+
+	@staticmethod
+	def get_sqlite_database_location():
+		project_config = ConfigHelper.__get_current_project_configuration()
+		current_proj_path = ConfigHelper.__get_current_project_path()
+
+		return os.path.join(
+			current_proj_path,
+			project_config.get("DATABASE", "sqlite_database", fallback=os.path.join("database", "gengen.sqlite")))
+
+	@staticmethod
+	def get_segment_shards_location():
+		"""Returns the directory of the sharded segment database."""
 		project_config = ConfigHelper.__get_current_project_configuration()
 		current_proj_path = ConfigHelper.__get_current_project_path()
 
-		return os.path.join(current_proj_path, project_config['CSV_LOCATIONS']['segment_database'])
+		return os.path.join(
+			current_proj_path,
+			project_config.get("DATABASE", "segment_shards", fallback=os.path.join("database", "segment_shards")))
 
 	@staticmethod
 	def get_command_log_location():
@@ -14,6 +14,8 @@ global_config_template = """[CURRENT_PROJECT]
 project_config_template = """[PROJECT_INFO]
 
 [CSV_LOCATIONS]
+
+[DATABASE]
 """
 
 
@@ -40,6 +42,10 @@ def __create_settings_file(name, abs_path):
 	cp["CSV_LOCATIONS"]["match_database"] = os.path.join("database", "all_matches.csv")
 	cp["CSV_LOCATIONS"]["segment_database"] = os.path.join("database", "all_segments.csv")
 	cp["CSV_LOCATIONS"]["command_log"] = os.path.join("database", "command_log.csv")
+	cp["DATABASE"]["backend"] = "csv"
+	cp["DATABASE"]["sqlite_database"] = os.path.join("database", "gengen.sqlite")
+	cp["DATABASE"]["segment_shards"] = os.path.join("database", "segment_shards")
+	cp["DATABASE"]["compression"] = "none"
 
 	ConfigHelper.write_project_configuration_to_file(cp, settings_path)
 
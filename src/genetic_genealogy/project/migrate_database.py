@@ -0,0 +1,66 @@
+import argparse
+import os
+
+from genetic_genealogy.databases.match_database import CSVMatchDatabase, SQLiteMatchDatabase
+from genetic_genealogy.databases.segment_database import SQLiteSegmentDatabase, ShardedSegmentDatabase, \
+	create_segment_database
+from genetic_genealogy.exit_codes import ExitCodes
+from genetic_genealogy.project.config_helper import ConfigHelper
+
+
+def __copy_database(source, target):
+	"""Loads the source database and copies all its records to the target database."""
+	source.load()
+	target.load()
+
+	for record in source.get_records():
+		target.add_record(record)
+
+	target.save()
+
+
+def migrate_database(args):
+	"""Copies the databases of the current project to the database of the given backend
+	and switches the project to it. The old databases are kept.
+	When migrating to the SQLite database, the csv match database and the segment database are copied.
+	When migrating to the sharded segment database, only the segment database is copied,
+	matches stay in the csv match database."""
+
+	backend = ConfigHelper.get_database_backend()
+
+	if backend == args.backend:
+		print("The current project already uses the " + args.backend + " database backend.")
+		exit(ExitCodes.wrong_arguments)
+
+	if backend == "sqlite":
+		print("The SQLite database cannot be migrated.")
+		exit(ExitCodes.wrong_arguments)
+
+	if args.backend == "sqlite":
+		target_location = ConfigHelper.get_sqlite_database_location()
+	else:
+		target_location = ConfigHelper.get_segment_shards_location()
+
+	if os.path.exists(target_location):
+		print("The " + args.backend + " database already exists, remove it to migrate the databases again.")
+		exit(ExitCodes.unique_required)
+
+	if args.backend == "sqlite":
+		__copy_database(CSVMatchDatabase(), SQLiteMatchDatabase())
+		__copy_database(create_segment_database(), SQLiteSegmentDatabase())
+	else:
+		__copy_database(create_segment_database(), ShardedSegmentDatabase())
+
+	ConfigHelper.set_database_backend(args.backend)
+
+	print("Databases were successfully migrated to " + target_location + ".")
+
+
+if __name__ == "__main__":
+	args_parser = argparse.ArgumentParser()
+
+	args_parser.add_argument("-b", "--backend", choices=["sqlite", "sharded"], default="sqlite")
+
+	arguments = args_parser.parse_args()
+
+	migrate_database(arguments)
@@ -0,0 +1,92 @@
+import sqlite3
+
+from genetic_genealogy.parsers.records import get_record_type, format_value
+
+
+class SQLiteHelper:
+	"""Helper methods for storing rows of the gengen formats in SQLite tables.
+	Columns are named after the format enum values, the id column is an integer primary key,
+	all other columns hold text formatted the same way as in the csv databases."""
+
+	@staticmethod
+	def connect(filename) -> sqlite3.Connection:
+		"""Opens the SQLite database in the given file, the file is created if it does not exist."""
+		return sqlite3.connect(filename)
+
+	@staticmethod
+	def get_columns(database_format) -> list:
+		"""Returns the names of columns of the given format."""
+		return [column.name for column in database_format]
+
+	@staticmethod
+	def to_values(record, database_format, id_column) -> tuple:
+		"""Returns the values of the record of the given format in the order of its columns.
+		The id is stored as int, all the other values as strings."""
+		return tuple(
+			record[column] if column == id_column else format_value(record[column])
+			for column in database_format
+		)
+
+	@staticmethod
+	def to_record(values, database_format):
+		"""Creates a record of the format from values in the order of the format columns,
+		values of the typed columns are converted."""
+		return get_record_type(database_format).from_strings(values)
+
+	@staticmethod
+	def create_table(connection, table, columns, id_column) -> None:
+		"""Creates the table with the given column names if it does not exist yet."""
+		definitions = [
+			SQLiteHelper.__quote(column) + (" INTEGER PRIMARY KEY" if column == id_column else " TEXT")
+			for column in columns
+		]
+
+		connection.execute(
+			"CREATE TABLE IF NOT EXISTS " + SQLiteHelper.__quote(table) + " (" + ", ".join(definitions) + ")")
+
+	@staticmethod
+	def create_index(connection, table, columns) -> None:
+		"""Creates an index of the table on the given columns if it does not exist yet."""
+		name = "_".join([table] + list(columns))
+
+		connection.execute(
+			"CREATE INDEX IF NOT EXISTS " + SQLiteHelper.__quote(name) + " ON " + SQLiteHelper.__quote(table)
+			+ " (" + ", ".join(SQLiteHelper.__quote(column) for column in columns) + ")")
+
+	@staticmethod
+	def insert(connection, table, columns, rows) -> None:
+		"""Inserts the rows (sequences of values in the order of columns) into the table."""
+		connection.executemany(
+			"INSERT INTO " + SQLiteHelper.__quote(table)
+			+ " (" + ", ".join(SQLiteHelper.__quote(column) for column in columns) + ")"
+			+ " VALUES (" + ", ".join("?" for _ in columns) + ")",
+			rows
+		)
+
+	@staticmethod
+	def select(connection, table, columns, where_columns=(), parameters=(), order_by=None) -> sqlite3.Cursor:
+		"""Selects the given columns of all rows, where the where_columns are equal to parameters.
+		Returns a cursor, rows are tuples of values in the order of columns."""
+		query = "SELECT " + ", ".join(SQLiteHelper.__quote(column) for column in columns) \
+			+ " FROM " + SQLiteHelper.__quote(table)
+
+		if len(where_columns) > 0:
+			query += " WHERE " + " AND ".join(SQLiteHelper.__quote(column) + " = ?" for column in where_columns)
+
+		if order_by is not None:
+			query += " ORDER BY " + SQLiteHelper.__quote(order_by)
+
+		return connection.execute(query, parameters)
+
+	@staticmethod
+	def get_largest_id(connection, table, id_column) -> int:
+		"""Returns the largest id in the table, 0 if the table is empty."""
+		largest_id = connection.execute(
+			"SELECT MAX(" + SQLiteHelper.__quote(id_column) + ") FROM " + SQLiteHelper.__quote(table)).fetchone()[0]
+
+		return 0 if largest_id is None else largest_id
+
+	@staticmethod
+	def __quote(name) -> str:
+		# some column names (e.g. end) are SQL keywords
+		return '"' + name + '"'
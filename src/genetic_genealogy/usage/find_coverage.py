@@ -0,0 +1,31 @@
+from genetic_genealogy.boxes.segments.coverage import CoverageFinder
+import argparse
+
+
+def find_coverage(args):
+	finder = CoverageFinder()
+
+	if args.from_database:
+		finder.load_segments(from_database=True)
+
+	else:
+		finder.load_segments(args.source_file)
+
+	finder.save_coverage(finder.find_coverage(args.min_depth), args.output_file)
+
+
+if __name__ == "__main__":
+	args_parser = argparse.ArgumentParser()
+
+	# add arguments
+	args_parser.add_argument("-of", "--output_file")
+	args_parser.add_argument("--min_depth", type=int, default=1)
+
+	i_group_input = args_parser.add_mutually_exclusive_group()
+	i_group_input.add_argument("-sf", "--source_file")
+	i_group_input.add_argument("-fd", "--from_database", action="store_true")
+
+	# parse arguments
+	arguments = args_parser.parse_args()
+
+	find_coverage(arguments)
@@ -1,25 +1,123 @@
+import configparser
+import io
+import os
+import re
+import sys
+
 from genetic_genealogy.boxes.segments.intersection_finder import CSVIntersectionFinder
+from genetic_genealogy.csv_io import CSVHelper
+from genetic_genealogy.exit_codes import ExitCodes
 import argparse
 
 
+def __read_ids(filename) -> list:
+	"""Reads ids from the given file, ids can be separated by whitespaces or commas.
+	If the filename is '-', ids are read from standard input."""
+	try:
+		if filename == "-":
+			text = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8-sig').read()
+		else:
+			with CSVHelper.open_text(filename) as ids_file:
+				text = ids_file.read()
+
+	except FileNotFoundError:
+		print("The ids file was not found.")
+		exit(ExitCodes.no_such_file)
+	except IOError:
+		print("The ids file could not be loaded.")
+		exit(ExitCodes.io_error)
+
+	try:
+		return [int(item) for item in re.split(r"[\s,]+", text) if item != ""]
+
+	except ValueError:
+		print("Wrong ids file format.")
+		exit(ExitCodes.wrong_input_format)
+
+
+def __get_state_filename(output_filename) -> str:
+	"""Returns the path of the file describing the state of intersections found incrementally."""
+	return os.path.splitext(output_filename)[0] + "_state.ini"
+
+
+def __find_intersections_incrementally(finder, args):
+	"""Finds only intersections of segments added to the database since the last run
+	and appends them to the output file.
+
+	The largest processed segment id and the thresholds are kept in a state file next to the output file.
+	If there is no state, the output file is missing or the thresholds have changed,
+	all the intersections are found again."""
+	state_filename = __get_state_filename(args.output_file)
+	thresholds = {
+		"min_overlap": str(args.min_overlap),
+		"min_cm": str(args.min_cm),
+		"min_snps": str(args.min_snps)
+	}
+
+	state = configparser.ConfigParser()
+	state.read(state_filename)
+
+	# the id must be read before searching, segments with larger ids are not processed
+	largest_segment_id = finder.get_largest_segment_id()
+
+	if "INTERSECTIONS" in state and os.path.exists(args.output_file) and all(
+			state["INTERSECTIONS"].get(key) == value for key, value in thresholds.items()):
+		processed_segment_id = int(state["INTERSECTIONS"]["processed_segment_id"])
+		finder.append_intersections(finder.find_new_intersections(processed_segment_id), args.output_file)
+
+	else:
+		finder.save_intersections(finder.find_all_intersections(args.jobs), args.output_file)
+
+	# state is written only after the intersections were saved
+	state["INTERSECTIONS"] = {"processed_segment_id": str(largest_segment_id), **thresholds}
+	with open(state_filename, "w") as state_file:
+		state.write(state_file)
+
+
 def find_segment_intersections(args):
-	finder = CSVIntersectionFinder()
+	ids_filename = args.segment_ids_file or args.person_ids_file
+	if ids_filename == "-" and not args.from_database and args.source_file is None:
+		print("Segments and ids cannot be both read from standard input.")
+		exit(ExitCodes.wrong_arguments)
+
+	if args.incremental and (not args.from_database or args.output_file is None or ids_filename is not None
+							 or args.segment_id is not None or args.person_id is not None):
+		print("Intersections can only be found incrementally for the whole segment database "
+			  "and must be saved to an output file.")
+		exit(ExitCodes.wrong_arguments)
+
+	# ids from a file are read before the segments, so that they can be used when loading the segments
+	segment_ids = args.segment_id
+	if args.segment_ids_file is not None:
+		segment_ids = __read_ids(args.segment_ids_file)
+
+	person_ids = args.person_id
+	if args.person_ids_file is not None:
+		person_ids = __read_ids(args.person_ids_file)
+
+	finder = CSVIntersectionFinder(args.min_overlap, args.min_cm, args.min_snps)
 
 	if args.from_database:
-		finder.load_segments(from_database=True)
+		# the segments of few ids are looked up in the memory mapped index of the database,
+		# the whole database is only loaded when all the intersections are found
+		finder.load_segments(
+			from_database=True, mapped=segment_ids is not None or person_ids is not None, segment_ids=segment_ids)
 
 	else:
 		finder.load_segments(args.source_file)
 
-	intersections = []
+	if args.incremental:
+		__find_intersections_incrementally(finder, args)
+		return
 
+	# intersections are found lazily while they are being saved
 	# check witch usage is requested
-	if args.segment_id is not None:
-		intersections = finder.find_intersections_of_segment(args.segment_id)
-	elif args.person_id is not None:
-		intersections = finder.find_intersections_of_person(args.person_id)
+	if segment_ids is not None:
+		intersections = finder.find_intersections_of_segments(segment_ids)
+	elif person_ids is not None:
+		intersections = finder.find_intersections_of_people(person_ids)
 	else:
-		intersections = finder.find_all_intersections()
+		intersections = finder.find_all_intersections(args.jobs)
 
 	finder.save_intersections(intersections, args.output_file)
 
@@ -29,14 +127,21 @@ if __name__ == "__main__":
 
 	# add arguments
 	args_parser.add_argument("-of", "--output_file")
+	args_parser.add_argument("-j", "--jobs", type=int, default=1)
+	args_parser.add_argument("--min_overlap", type=int, default=0)
+	args_parser.add_argument("--min_cm", type=float, default=0)
+	args_parser.add_argument("--min_snps", type=int, default=0)
+	args_parser.add_argument("--incremental", action="store_true")
 
 	i_group_input = args_parser.add_mutually_exclusive_group()
 	i_group_input.add_argument("-sf", "--source_file")
 	i_group_input.add_argument("-fd", "--from_database", action="store_true")
 
 	group = args_parser.add_mutually_exclusive_group()
-	group.add_argument("-sid", "--segment_id", type=int)
-	group.add_argument("-id", "--person_id", type=int)
+	group.add_argument("-sid", "--segment_id", type=int, nargs="+")
+	group.add_argument("-id", "--person_id", type=int, nargs="+")
+	group.add_argument("-sidf", "--segment_ids_file")
+	group.add_argument("-pidf", "--person_ids_file")
 
 	# parse arguments
 	arguments = args_parser.parse_args()
@@ -15,7 +15,7 @@ def parse_segments(args):
 	source_file = args.source_file
 	output_file = args.output_file
 
-	parser.parse(source_file)
+	parser.parse(source_file, args.jobs)
 	parser.save_to_file(output_file)
 
 	if args.verbose:
@@ -28,6 +28,7 @@ if __name__ == "__main__":
 	args_parser.add_argument("-sf", "--source_file")
 	args_parser.add_argument("-of", "--output_file")
 	args_parser.add_argument("-v", "--verbose", action="store_true")
+	args_parser.add_argument("-j", "--jobs", type=int, default=1)
 
 	me_group = args_parser.add_mutually_exclusive_group(required=True)
 	me_group.add_argument("--ftdna", action="store_true")
@@ -0,0 +1,19 @@
+import argparse
+
+import pytest
+
+from genetic_genealogy.project.checkout_project import checkout_project
+from genetic_genealogy.project.create_new_project import create_new_project
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+	"""Creates a new project in a temporary directory and checks it out, the global configuration
+	is kept in the temporary directory too. Returns the path of the project."""
+	monkeypatch.setenv("XDG_CONFIG_HOME", str(tmp_path / "config"))
+
+	path = str(tmp_path / "project")
+	create_new_project(argparse.Namespace(name="test", path=path, existing=False))
+	checkout_project(argparse.Namespace(name="test"))
+
+	return path
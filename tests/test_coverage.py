@@ -0,0 +1,117 @@
+import random
+
+import pytest
+
+from genetic_genealogy.boxes.segments.coverage import CoverageFinder
+from genetic_genealogy.csv_io import CSVHelper
+from genetic_genealogy.parsers.formats import CoverageFormatEnum, SegmentFormatEnum
+
+
+def brute_force_coverage(segments, min_depth) -> list:
+	"""Counts the people covering every position, returns (chromosome id, start, end, depth)
+	of the runs of positions with the same depth of at least min_depth."""
+	result = []
+
+	for chrom_id in dict.fromkeys(chrom_id for chrom_id, _, _, _ in segments):
+		covering = {}
+		for _, person_id, start, end in (segment for segment in segments if segment[0] == chrom_id):
+			for position in range(start, end + 1):
+				covering.setdefault(position, set()).add(person_id)
+
+		run = None
+		for position in range(min(covering), max(covering) + 2):
+			depth = len(covering.get(position, ()))
+
+			if run is not None and (depth != run[3] or position != run[2] + 1):
+				if run[3] >= min_depth:
+					result.append(tuple(run))
+				run = None
+
+			if depth > 0:
+				if run is None:
+					run = [chrom_id, position, position, depth]
+				else:
+					run[2] = position
+
+	return result
+
+
+def find_coverage(tmp_path, segments, min_depth=1) -> list:
+	"""Saves the (chromosome id, person id, start, end) segments and returns their coverage
+	as (chromosome id, start, end, depth) tuples."""
+	sf = SegmentFormatEnum
+
+	rows = []
+	for chrom_id, person_id, start, end in segments:
+		row = ['' for _ in sf]
+		row[sf.segment_id] = len(rows) + 1
+		row[sf.person_id] = person_id
+		row[sf.chromosome_id] = chrom_id
+		row[sf.start] = start
+		row[sf.end] = end
+		rows.append(row)
+
+	filename = str(tmp_path / "segments.csv")
+	CSVHelper.save_csv(rows, sf, filename)
+
+	finder = CoverageFinder()
+	finder.load_segments(filename)
+
+	of = CoverageFormatEnum
+	return [
+		(row[of.chromosome_id], row[of.start], row[of.end], row[of.depth])
+		for row in finder.find_coverage(min_depth)
+	]
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("min_depth", [1, 3])
+def test_coverage_matches_counting_per_position(tmp_path, seed, min_depth):
+	rng = random.Random(seed)
+
+	segments = []
+	for chrom_id in ["1", "2", "X"]:
+		for _ in range(rng.randint(1, 25)):
+			start = rng.randint(1, 200)
+			segments.append((chrom_id, rng.randint(1, 6), start, start + rng.randint(0, 50)))
+
+	assert find_coverage(tmp_path, segments, min_depth) == brute_force_coverage(segments, min_depth)
+
+
+def test_adjacent_segments(tmp_path):
+	segments = [
+		# adjacent segments of one person make one region of depth 1
+		("1", 1, 1, 10),
+		("1", 1, 11, 20),
+		# a segment of another person starting right after the end of the first one
+		("1", 2, 21, 30),
+		# segments of different people ending and starting at the same position
+		("1", 3, 40, 50),
+		("1", 4, 50, 60)
+	]
+
+	assert find_coverage(tmp_path, segments) == [
+		("1", 1, 30, 1),
+		("1", 40, 49, 1),
+		("1", 50, 50, 2),
+		("1", 51, 60, 1)
+	]
+
+
+def test_nested_segments(tmp_path):
+	segments = [
+		("1", 1, 1, 100),
+		("1", 2, 20, 80),
+		("1", 3, 40, 60),
+		# a nested segment of the same person is counted only once
+		("1", 3, 45, 50)
+	]
+
+	assert find_coverage(tmp_path, segments) == [
+		("1", 1, 19, 1),
+		("1", 20, 39, 2),
+		("1", 40, 60, 3),
+		("1", 61, 80, 2),
+		("1", 81, 100, 1)
+	]
+	assert find_coverage(tmp_path, segments, min_depth=3) == [("1", 40, 60, 3)]
@@ -0,0 +1,22 @@
+from genetic_genealogy.databases.segment_database import CSVSegmentDatabase
+from genetic_genealogy.project.config_helper import ConfigHelper
+
+
+def test_load_and_compact_keep_the_values(project):
+	filename = ConfigHelper.get_segment_database_location()
+	content = (
+		"segment_id,person_id,person_name,source,chromosome_id,start,end,length_cm,snps,density\r\n"
+		"1,2,Name,GEDmatch,1,752721,2938924,7.0,295,\r\n"
+		"2,002,Other Name,FamilyTreeDNA,X,+100,200,7,0500,0.50\r\n"
+		"3,3,,FamilyTreeDNA,2,100,200,,,\r\n"
+	).encode("utf-8-sig")
+
+	with open(filename, 'wb') as database_file:
+		database_file.write(content)
+
+	database = CSVSegmentDatabase()
+	database.load()
+	database.compact()
+
+	with open(filename, 'rb') as database_file:
+		assert database_file.read() == content
@@ -0,0 +1,33 @@
+import os
+
+import pytest
+
+from genetic_genealogy.csv_io import CSVHelper
+
+
+@pytest.mark.parametrize("complete, incomplete", [
+	(b"", b""),
+	(b"a,b\r\n1,2\r\n", b""),
+	(b"a,b\r\n1,2\r\n", b"3,"),
+	(b"a,b\r\n1,2\r\n", b"3,4\r"),
+	(b"a,b\r\n" + b"1,2\r\n" * 50000, b"3," * 50000),
+	(b"", b"a,b"),
+	(b"", b"a," * 50000)
+])
+def test_remove_incomplete_row(tmp_path, complete, incomplete):
+	filename = str(tmp_path / "database.csv")
+	with open(filename, "wb") as file:
+		file.write(complete + incomplete)
+
+	removed = CSVHelper.remove_incomplete_row(filename)
+
+	assert removed == (len(incomplete) > 0)
+	if complete:
+		with open(filename, "rb") as file:
+			assert file.read() == complete
+	else:
+		assert not os.path.exists(filename)
+
+
+def test_remove_incomplete_row_of_missing_file(tmp_path):
+	assert not CSVHelper.remove_incomplete_row(str(tmp_path / "missing.csv"))
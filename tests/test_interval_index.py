@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+from genetic_genealogy.boxes.segments.interval_index import IntervalIndex
+
+
+def brute_force_overlapping(starts, ends, start, end) -> list:
+	"""Scans all the intervals, returns the sorted positions of those overlapping the interval from start to end."""
+	return [i for i in range(len(starts)) if starts[i] <= end and ends[i] >= start]
+
+
+def random_intervals(rng, count, length):
+	"""Returns starts and ends of count random intervals sorted by start, some of them are single points."""
+	intervals = []
+	for _ in range(count):
+		start = rng.randint(1, length)
+		intervals.append((start, start + rng.choice([0, rng.randint(0, length // 3)])))
+
+	intervals.sort(key=lambda interval: interval[0])
+
+	return [start for start, _ in intervals], [end for _, end in intervals]
+
+
+@pytest.mark.parametrize("seed", range(3))
+# sizes around powers of two, so that the tree is both full and incomplete
+@pytest.mark.parametrize("count", [0, 1, 2, 3, 15, 16, 17, 31, 33, 100, 255, 256, 257, 1000])
+def test_find_overlapping_matches_brute_force(seed, count):
+	rng = random.Random(seed)
+	starts, ends = random_intervals(rng, count, 2000)
+
+	index = IntervalIndex(starts, ends, range(count))
+
+	for _ in range(100):
+		start = rng.randint(0, 2100)
+		end = start + rng.choice([0, rng.randint(0, 300)])
+
+		assert sorted(index.find_overlapping(start, end)) == brute_force_overlapping(starts, ends, start, end)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_index_built_from_stored_max_ends(seed):
+	rng = random.Random(seed)
+	starts, ends = random_intervals(rng, 500, 5000)
+
+	built = IntervalIndex(starts, ends, range(500))
+	index = IntervalIndex(starts, ends, range(500), built.max_ends)
+
+	for _ in range(100):
+		start = rng.randint(0, 5000)
+		end = start + rng.randint(0, 500)
+
+		assert sorted(index.find_overlapping(start, end)) == brute_force_overlapping(starts, ends, start, end)
+
+
+def test_empty_index():
+	index = IntervalIndex([], [], [])
+
+	assert len(index) == 0
+	assert index.find_overlapping(1, 100) == []
+
+
+def test_single_point_intervals():
+	starts = [5, 5, 7]
+	ends = [5, 5, 7]
+	index = IntervalIndex(starts, ends, ["a", "b", "c"])
+
+	assert sorted(index.find_overlapping(5, 5)) == ["a", "b"]
+	assert index.find_overlapping(6, 6) == []
+	assert sorted(index.find_overlapping(4, 7)) == ["a", "b", "c"]
+
+
+def test_touching_endpoints():
+	# coordinates are inclusive, an interval ending where the query starts overlaps it
+	starts = [1, 10, 20]
+	ends = [10, 20, 30]
+	index = IntervalIndex(starts, ends, range(3))
+
+	assert sorted(index.find_overlapping(10, 10)) == [0, 1]
+	assert sorted(index.find_overlapping(20, 25)) == [1, 2]
+	assert index.find_overlapping(31, 40) == []
+	assert index.find_overlapping(-5, 0) == []
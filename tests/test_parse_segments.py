@@ -0,0 +1,98 @@
+import csv
+import gzip
+import os
+import random
+
+import pytest
+
+from genetic_genealogy.parsers.match_parsers import FTDNAMatchParser
+from genetic_genealogy.parsers.segment_data_parsers import FTDNASegmentParser, SegmentParser
+from genetic_genealogy.project.config_helper import ConfigHelper
+
+EXAMPLE = os.path.join(os.path.dirname(__file__), os.pardir, "anonym_example", "FTDNA")
+
+
+@pytest.fixture
+def matches(project, monkeypatch):
+	"""Parses the example FTDNA matches into the project. Files are split into small chunks,
+	which are found by reading small blocks, so that the chunks of the example file cross the tricky rows."""
+	FTDNAMatchParser().parse(os.path.join(EXAMPLE, "FTDNA_match_data.csv"))
+
+	monkeypatch.setattr(SegmentParser, "_SegmentParser__chunk_size", 2000)
+	monkeypatch.setattr(SegmentParser, "_SegmentParser__block_size", 64)
+
+
+def write_tricky_segments(filename) -> None:
+	"""Writes the example FTDNA segments with CRLF line endings and without the newline after the last row.
+	Some names are quoted and hold newlines (they are still identified, the whitespace is normalized),
+	some unknown names hold quotes and newlines, some values are quoted."""
+	rng = random.Random(1)
+
+	with open(os.path.join(EXAMPLE, "FTDNA_segment_data.csv"), newline='', encoding="utf-8-sig") as example_file:
+		rows = list(csv.reader(example_file))
+
+	tricky_rows = [rows[0]]
+	for row in rows[1:]:
+		row = list(row)
+		choice = rng.randrange(6)
+
+		if choice == 0:
+			row[0] = row[0].replace(" ", "\r\n", 1)
+		elif choice == 1:
+			row[0] = row[0].replace(" ", "\n \n", 1)
+		elif choice == 2:
+			tricky_rows.append(['Unknown "Nick\r\nName', row[1], row[2], row[3], row[4], row[5]])
+		elif choice == 3:
+			tricky_rows.append(['"\n"', '"', "\n", row[3], row[4], row[5]])
+
+		tricky_rows.append(row)
+
+	with open(filename, 'w', newline='', encoding="utf-8-sig") as output_file:
+		writer = csv.writer(output_file, quoting=csv.QUOTE_MINIMAL)
+		writer.writerows(tricky_rows)
+
+		# the last row does not end with a newline
+		output_file.seek(output_file.tell() - 2)
+		output_file.truncate()
+
+
+def parse(source_filename, output_filename, jobs) -> tuple:
+	"""Parses the segments into a new segment database, returns the output and the segment database."""
+	database_filename = ConfigHelper.get_segment_database_location()
+	if os.path.exists(database_filename):
+		os.remove(database_filename)
+
+	parser = FTDNASegmentParser()
+	parser.parse(source_filename, jobs)
+	parser.save_to_file(output_filename)
+
+	with open(output_filename, 'rb') as output_file, open(database_filename, 'rb') as database_file:
+		return output_file.read(), database_file.read(), parser._unidentified_identifiers
+
+
+@pytest.mark.parametrize("compressed", [False, True])
+def test_parsing_in_chunks_gives_the_same_result(tmp_path, matches, compressed):
+	filename = str(tmp_path / "segments.csv")
+	write_tricky_segments(filename)
+
+	if compressed:
+		with open(filename, 'rb') as source_file, gzip.open(filename + ".gz", 'wb') as compressed_file:
+			compressed_file.write(source_file.read())
+		filename += ".gz"
+
+	expected = parse(filename, str(tmp_path / "output_1.csv"), 1)
+
+	assert parse(filename, str(tmp_path / "output_4.csv"), 4) == expected
+	assert parse(filename, str(tmp_path / "output_2.csv"), 2) == expected
+
+
+def test_tricky_rows_are_parsed_whole(tmp_path, matches):
+	filename = str(tmp_path / "segments.csv")
+	write_tricky_segments(filename)
+
+	example = parse(os.path.join(EXAMPLE, "FTDNA_segment_data.csv"), str(tmp_path / "example.csv"), 1)
+	tricky = parse(filename, str(tmp_path / "output.csv"), 4)
+
+	# the rows with the newlines in the known names are identified, the unknown rows are skipped
+	assert tricky[:2] == example[:2]
+	assert set(tricky[2]) - set(example[2]) == {'Unknown "Nick\nName', '"\n"'}
@@ -0,0 +1,56 @@
+import pickle
+
+import pytest
+
+from genetic_genealogy.parsers.formats import SegmentFormatEnum
+from genetic_genealogy.parsers.records import format_value, get_record_type
+
+
+SegmentRecord = get_record_type(SegmentFormatEnum)
+
+
+def test_contains_columns_of_the_format():
+	record = SegmentRecord()
+
+	assert SegmentFormatEnum.segment_id in record
+	assert SegmentFormatEnum.density in record
+	assert len(SegmentFormatEnum) not in record
+	assert -1 not in record
+
+
+def test_contains_other_keys():
+	record = SegmentRecord()
+
+	assert "segment_id" not in record
+	assert None not in record
+	assert 1.5 not in record
+	assert record.get("start", "default") == "default"
+
+
+@pytest.mark.parametrize("text", ["7", "7.0", "7.50", "12.5", "0.1", "1e3", "-3", ""])
+def test_floats_are_written_as_they_were_read(text):
+	values = ["1", "2", "name", "FamilyTreeDNA", "X", "100", "200", text, "500", text]
+
+	record = SegmentRecord.from_strings(values)
+
+	assert record.to_strings() == values
+	assert record.length_cm == (float(text) if text else None)
+
+
+@pytest.mark.parametrize("text", ["7", "007", "+7", "-0", "1000", ""])
+def test_ints_are_written_as_they_were_read(text):
+	values = [text, "2", "name", "FamilyTreeDNA", "X", text, "200", "7.5", text, "1.5"]
+
+	record = SegmentRecord.from_strings(values)
+
+	assert record.to_strings() == values
+	assert record.segment_id == (int(text) if text else None)
+
+
+def test_parsed_numbers_can_be_pickled():
+	record = SegmentRecord.from_strings(["007", "2", "name", "", "1", "100", "200", "7.0", "500", "7"])
+
+	loaded = pickle.loads(pickle.dumps(record.values()))
+
+	assert loaded == record.values()
+	assert [format_value(value) for value in loaded] == record.to_strings()
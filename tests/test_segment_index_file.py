@@ -0,0 +1,122 @@
+import mmap
+import os
+import random
+
+import pytest
+
+from genetic_genealogy.boxes.segments.interval_index import IntervalIndex
+from genetic_genealogy.boxes.segments.segment_index_file import SegmentIndexFile
+from genetic_genealogy.boxes.segments.segment_store import SegmentStore
+from genetic_genealogy.csv_io import CSVHelper
+from genetic_genealogy.parsers.formats import SegmentFormatEnum
+
+
+@pytest.fixture
+def database(tmp_path):
+	"""Saves a random csv segment database with its index, returns the csv file name and the store it holds."""
+	rng = random.Random(1)
+	sf = SegmentFormatEnum
+
+	rows = []
+	for chrom_id in ["1", "2", "X"]:
+		for _ in range(200):
+			start = rng.randint(1, 100000)
+			row = ['' for _ in sf]
+			row[sf.segment_id] = len(rows) + 1
+			row[sf.person_id] = rng.randint(1, 30)
+			row[sf.chromosome_id] = chrom_id
+			row[sf.start] = start
+			row[sf.end] = start + rng.randint(0, 5000)
+			row[sf.length_cm] = round(rng.uniform(1, 50), 2)
+			row[sf.snps] = rng.randint(100, 2000)
+			rows.append(row)
+
+	filename = str(tmp_path / "all_segments.csv")
+	CSVHelper.save_csv(rows, sf, filename)
+
+	store = SegmentStore.from_rows(CSVHelper.iterate_csv(filename, sf))
+	SegmentIndexFile.save(store, filename, os.stat(filename))
+
+	return filename, store
+
+
+def assert_same_stores(store, other):
+	assert other.chromosome_offsets == store.chromosome_offsets
+	for name, _ in SegmentStore.columns:
+		assert list(getattr(other, name)) == list(getattr(store, name))
+
+
+def test_loaded_index_holds_the_store(database):
+	filename, store = database
+
+	assert_same_stores(store, SegmentIndexFile.load(filename))
+
+
+def test_mapped_index_holds_the_store(database):
+	filename, store = database
+
+	mapped = SegmentIndexFile.open(filename)
+
+	assert_same_stores(store, mapped)
+
+	for position in [0, 1, len(store) // 2, len(store) - 1]:
+		assert mapped.get_position(store.segment_ids[position]) == position
+		assert mapped.get_positions_of_person(store.person_ids[position]) == \
+			store.get_positions_of_person(store.person_ids[position])
+	assert mapped.get_position(len(store) + 1) is None
+
+	for chrom_id, (begin, end) in store.chromosome_offsets.items():
+		index = IntervalIndex(store.starts[begin:end], store.ends[begin:end], range(begin, end))
+		assert list(mapped.get_max_ends(chrom_id)) == index.max_ends
+
+
+def test_index_of_changed_database_is_outdated(database):
+	filename, _ = database
+
+	with open(filename, 'a') as file:
+		file.write("\n")
+
+	assert SegmentIndexFile.load(filename) is None
+	assert SegmentIndexFile.open(filename) is None
+
+
+def test_index_of_touched_database_is_outdated(database):
+	filename, _ = database
+
+	stat = os.stat(filename)
+	os.utime(filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+	assert SegmentIndexFile.load(filename) is None
+	assert SegmentIndexFile.open(filename) is None
+
+
+def test_missing_index(tmp_path):
+	filename = str(tmp_path / "all_segments.csv")
+	CSVHelper.save_csv([], SegmentFormatEnum, filename)
+
+	assert SegmentIndexFile.load(filename) is None
+	assert SegmentIndexFile.open(filename) is None
+
+
+@pytest.mark.parametrize("kept", [0, 10, 40, 100, 1000, -8, -1])
+def test_truncated_index(database, monkeypatch, kept):
+	filename, _ = database
+	index_filename = SegmentIndexFile.get_location(filename)
+
+	size = os.path.getsize(index_filename)
+	with open(index_filename, 'rb+') as index_file:
+		index_file.truncate(kept if kept >= 0 else size + kept)
+
+	# maps of the truncated index must be closed, not left to the garbage collector
+	maps = []
+
+	class RecordedMap(mmap.mmap):
+		def __init__(self, *args, **kwargs):
+			super().__init__()
+			maps.append(self)
+
+	monkeypatch.setattr(mmap, "mmap", RecordedMap)
+
+	assert SegmentIndexFile.load(filename) is None
+	assert SegmentIndexFile.open(filename) is None
+	assert all(index_map.closed for index_map in maps)
@@ -0,0 +1,159 @@
+import configparser
+import os
+import random
+import shutil
+
+import pytest
+
+from genetic_genealogy.csv_io import CSVHelper
+from genetic_genealogy.databases.segment_database import ShardedSegmentDatabase
+from genetic_genealogy.parsers.formats import SegmentFormatEnum, SegmentShardFormatEnum
+from genetic_genealogy.project.config_helper import ConfigHelper
+
+
+@pytest.fixture(params=["none", "gzip"])
+def shards(project, request):
+	"""Configures the sharded backend with the compression given by the parameter and saves a database
+	of segments of three chromosomes. Returns the directory of the shards."""
+	settings_path = os.path.join(project, "settings.ini")
+	settings = configparser.ConfigParser()
+	settings.read(settings_path)
+	settings["DATABASE"]["backend"] = "sharded"
+	settings["DATABASE"]["compression"] = request.param
+	ConfigHelper.write_project_configuration_to_file(settings, settings_path)
+
+	add_segments(random.Random(1), 60)
+
+	return ConfigHelper.get_segment_shards_location()
+
+
+def add_segments(rng, count) -> None:
+	"""Adds count random segments to the sharded database and saves it."""
+	sf = SegmentFormatEnum
+
+	database = ShardedSegmentDatabase()
+	database.load()
+
+	for _ in range(count):
+		segment = sf.create_record()
+		segment[sf.segment_id] = database.get_new_id()
+		segment[sf.person_id] = rng.randint(1, 10)
+		segment[sf.person_name] = "person " + str(segment[sf.person_id])
+		segment[sf.chromosome_id] = rng.choice(["1", "2", "X"])
+		segment[sf.start] = rng.randint(1, 100000)
+		segment[sf.end] = segment[sf.start] + rng.randint(0, 10000)
+		database.add_record(segment)
+
+	database.save()
+
+
+def load_records() -> list:
+	"""Loads the sharded database, returns all its segments as strings sorted by id."""
+	database = ShardedSegmentDatabase()
+	database.load()
+
+	records = sorted(database.get_records(), key=lambda segment: segment[SegmentFormatEnum.segment_id])
+	return [record.to_strings() for record in records]
+
+
+def read_manifest(directory) -> dict:
+	"""Returns the rows of the manifest as strings by chromosome ids."""
+	manifest = CSVHelper.load_csv(os.path.join(directory, "manifest.csv"), SegmentShardFormatEnum)
+	return {shard[SegmentShardFormatEnum.chromosome_id]: shard.to_strings() for shard in manifest}
+
+
+def write_manifest(directory, manifest) -> None:
+	CSVHelper.replace_csv(
+		[SegmentShardFormatEnum.create_record(shard) for shard in manifest.values()],
+		SegmentShardFormatEnum,
+		os.path.join(directory, "manifest.csv"))
+
+
+def test_manifest_describes_the_shards(shards):
+	sf = SegmentFormatEnum
+	records = load_records()
+	manifest = read_manifest(shards)
+
+	assert sorted(manifest.keys()) == ["1", "2", "X"]
+	assert sum(int(shard[SegmentShardFormatEnum.segment_count]) for shard in manifest.values()) == len(records) == 60
+
+	for chrom_id, shard in manifest.items():
+		location = os.path.join(shards, shard[SegmentShardFormatEnum.file_name])
+		segment_ids = [int(record[sf.segment_id]) for record in records if record[sf.chromosome_id] == chrom_id]
+
+		assert int(shard[SegmentShardFormatEnum.size]) == os.path.getsize(location)
+		assert int(shard[SegmentShardFormatEnum.segment_count]) == len(segment_ids)
+		assert int(shard[SegmentShardFormatEnum.largest_segment_id]) == max(segment_ids)
+
+		ranges = []
+		for id_range in shard[SegmentShardFormatEnum.segment_id_ranges].split():
+			first, last = id_range.split("-")
+			ranges.extend(range(int(first), int(last) + 1))
+		assert ranges == segment_ids
+
+
+def test_deleted_manifest_row_is_created_again(shards):
+	records = load_records()
+	manifest = read_manifest(shards)
+
+	write_manifest(shards, {chrom_id: shard for chrom_id, shard in manifest.items() if chrom_id != "2"})
+
+	assert load_records() == records
+	assert read_manifest(shards) == manifest
+
+
+def test_edited_manifest_row_is_created_again(shards):
+	records = load_records()
+	manifest = read_manifest(shards)
+
+	edited = {chrom_id: list(shard) for chrom_id, shard in manifest.items()}
+	edited["1"][SegmentShardFormatEnum.size] = "10"
+	edited["1"][SegmentShardFormatEnum.segment_count] = "1"
+	edited["1"][SegmentShardFormatEnum.segment_id_ranges] = "1-1"
+	write_manifest(shards, edited)
+
+	assert load_records() == records
+	assert read_manifest(shards) == manifest
+
+
+def test_missing_manifest_is_created_again(shards):
+	records = load_records()
+	manifest = read_manifest(shards)
+
+	os.remove(os.path.join(shards, "manifest.csv"))
+
+	assert load_records() == records
+	assert read_manifest(shards) == manifest
+
+
+def test_manifest_of_interrupted_save(shards):
+	# the manifest is replaced last, an interrupted save leaves the manifest of the previous save
+	shutil.copy(os.path.join(shards, "manifest.csv"), os.path.join(shards, "previous.csv"))
+	add_segments(random.Random(2), 30)
+	records = load_records()
+	manifest = read_manifest(shards)
+	os.replace(os.path.join(shards, "previous.csv"), os.path.join(shards, "manifest.csv"))
+
+	location = os.path.join(shards, manifest["X"][SegmentShardFormatEnum.file_name])
+	if not CSVHelper.is_compressed(location):
+		# the last segment was not written completely
+		with open(location, 'a') as shard_file:
+			shard_file.write("1000,1,person 1,")
+
+	assert load_records() == records
+	assert read_manifest(shards) == manifest
+
+	# new segments get ids after the kept ones
+	add_segments(random.Random(3), 1)
+	assert int(load_records()[-1][SegmentFormatEnum.segment_id]) == 91
+
+
+def test_missing_shard_is_removed_from_manifest(shards):
+	sf = SegmentFormatEnum
+	records = load_records()
+	manifest = read_manifest(shards)
+
+	os.remove(os.path.join(shards, manifest["2"][SegmentShardFormatEnum.file_name]))
+
+	assert load_records() == [record for record in records if record[sf.chromosome_id] != "2"]
+	assert read_manifest(shards) == {chrom_id: shard for chrom_id, shard in manifest.items() if chrom_id != "2"}
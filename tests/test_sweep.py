@@ -0,0 +1,122 @@
+import random
+
+import pytest
+
+from genetic_genealogy.boxes.segments.intersection_finder import CSVIntersectionFinder
+from genetic_genealogy.boxes.segments.sweep import sweep_intersections
+from genetic_genealogy.csv_io import CSVHelper
+from genetic_genealogy.parsers.formats import SegmentFormatEnum, SegmentIntersectionFormatEnum
+
+
+def brute_force_intersections(starts, ends, min_overlap=1):
+	"""Compares every pair of segments, returns the set of (i, j, start, end) tuples expected from the sweep."""
+	result = set()
+
+	for i in range(len(starts)):
+		for j in range(i):
+			start = max(starts[i], starts[j])
+			end = min(ends[i], ends[j])
+
+			if end - start + 1 >= max(min_overlap, 1):
+				result.add((i, j, start, end))
+
+	return result
+
+
+def random_segments(rng, count, length):
+	"""Returns starts and ends of count random segments sorted by start."""
+	segments = []
+	for _ in range(count):
+		start = rng.randint(1, length)
+		segments.append((start, start + rng.randint(0, length // 4)))
+
+	segments.sort(key=lambda segment: segment[0])
+
+	return [start for start, _ in segments], [end for _, end in segments]
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("min_overlap", [0, 1, 5, 30])
+def test_sweep_matches_brute_force(seed, min_overlap):
+	rng = random.Random(seed)
+	starts, ends = random_segments(rng, rng.randint(0, 60), 200)
+
+	found = list(sweep_intersections(starts, ends, min_overlap))
+
+	assert len(found) == len(set(found))
+	assert set(found) == brute_force_intersections(starts, ends, min_overlap)
+
+
+def test_touching_segments():
+	# coordinates are inclusive, segments sharing a single position intersect
+	starts = [1, 10, 11]
+	ends = [10, 20, 30]
+
+	assert set(sweep_intersections(starts, ends)) == {(1, 0, 10, 10), (2, 1, 11, 20)}
+	assert set(sweep_intersections(starts, ends, 2)) == {(2, 1, 11, 20)}
+
+
+def test_nested_segments():
+	starts = [1, 5, 5, 8]
+	ends = [100, 50, 5, 9]
+
+	assert set(sweep_intersections(starts, ends)) == {
+		(1, 0, 5, 50),
+		(2, 0, 5, 5),
+		(2, 1, 5, 5),
+		(3, 0, 8, 9),
+		(3, 1, 8, 9)
+	}
+	assert set(sweep_intersections(starts, ends, 2)) == {(1, 0, 5, 50), (3, 0, 8, 9), (3, 1, 8, 9)}
+
+
+def test_empty_and_single_segment():
+	assert list(sweep_intersections([], [])) == []
+	assert list(sweep_intersections([1], [10])) == []
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_find_all_intersections_on_more_chromosomes(tmp_path, jobs):
+	rng = random.Random(jobs)
+	sf = SegmentFormatEnum
+
+	rows = []
+	expected = set()
+	for chrom_id in ["1", "2", "X"]:
+		starts, ends = random_segments(rng, 40, 500)
+
+		first_id = len(rows) + 1
+		for start, end in zip(starts, ends):
+			row = ['' for _ in sf]
+			row[sf.segment_id] = len(rows) + 1
+			row[sf.person_id] = rng.randint(1, 10)
+			row[sf.chromosome_id] = chrom_id
+			row[sf.start] = start
+			row[sf.end] = end
+			rows.append(row)
+
+		for i, j, start, end in brute_force_intersections(starts, ends, 3):
+			# segments starting at the same position can be swept in any order
+			expected.add((first_id + j, first_id + i, start, end))
+
+	# segments of different chromosomes are interleaved in the file
+	rng.shuffle(rows)
+	filename = str(tmp_path / "segments.csv")
+	CSVHelper.save_csv(rows, sf, filename)
+
+	finder = CSVIntersectionFinder(min_overlap=3)
+	finder.load_segments(filename)
+
+	of = SegmentIntersectionFormatEnum
+	found = [
+		(
+			min(row[of.segment_1_id], row[of.segment_2_id]),
+			max(row[of.segment_1_id], row[of.segment_2_id]),
+			row[of.start],
+			row[of.end]
+		)
+		for row in finder.find_all_intersections(jobs)
+	]
+
+	assert len(found) == len(set(found))
+	assert set(found) == expected
@@ -0,0 +1,115 @@
+import random
+
+import pytest
+
+from genetic_genealogy.boxes.segments.intersection_finder import CSVIntersectionFinder
+from genetic_genealogy.boxes.segments.sweep import triangulation_groups
+from genetic_genealogy.csv_io import CSVHelper
+from genetic_genealogy.parsers.formats import SegmentFormatEnum, TriangulationGroupFormatEnum
+
+
+def brute_force_groups(starts, ends, person_ids, min_size) -> list:
+	"""Finds the people covering every position, returns (start, end, person_ids) of the regions covered
+	by the same people, which are neither a subset of the people covering the previous nor the next region."""
+	length = max(ends, default=0) + 2
+	covering = [set() for _ in range(length)]
+	for start, end, person_id in zip(starts, ends, person_ids):
+		for position in range(start, end + 1):
+			covering[position].add(person_id)
+
+	# regions of positions covered by the same people
+	regions = []
+	for position in range(length):
+		if regions and covering[position] == regions[-1][2]:
+			regions[-1][1] = position
+		else:
+			regions.append([position, position, covering[position]])
+
+	result = []
+	for i, (start, end, people) in enumerate(regions):
+		if len(people) >= min_size and not people <= regions[i - 1][2] and not people <= regions[i + 1][2]:
+			result.append((start, end, sorted(people)))
+
+	return result
+
+
+@pytest.mark.parametrize("seed", range(30))
+@pytest.mark.parametrize("min_size", [2, 3])
+def test_triangulation_groups_match_brute_force(seed, min_size):
+	rng = random.Random(seed)
+
+	segments = []
+	for _ in range(rng.randint(0, 30)):
+		start = rng.randint(1, 150)
+		segments.append((start, start + rng.randint(0, 40), rng.randint(1, 8)))
+	segments.sort(key=lambda segment: segment[0])
+
+	starts = [start for start, _, _ in segments]
+	ends = [end for _, end, _ in segments]
+	person_ids = [person_id for _, _, person_id in segments]
+
+	assert list(triangulation_groups(starts, ends, person_ids, min_size)) == \
+		brute_force_groups(starts, ends, person_ids, min_size)
+
+
+def find_groups(tmp_path, segments, min_size=3) -> list:
+	"""Saves the (chromosome id, person id, start, end) segments, finds their triangulation groups
+	and returns them as (chromosome id, start, end, person ids) tuples."""
+	sf = SegmentFormatEnum
+
+	rows = []
+	for chrom_id, person_id, start, end in segments:
+		row = ['' for _ in sf]
+		row[sf.segment_id] = len(rows) + 1
+		row[sf.person_id] = person_id
+		row[sf.chromosome_id] = chrom_id
+		row[sf.start] = start
+		row[sf.end] = end
+		rows.append(row)
+
+	filename = str(tmp_path / "segments.csv")
+	CSVHelper.save_csv(rows, sf, filename)
+
+	finder = CSVIntersectionFinder()
+	finder.load_segments(filename)
+
+	tf = TriangulationGroupFormatEnum
+	return [
+		(row[tf.chromosome_id], row[tf.start], row[tf.end], row[tf.person_ids])
+		for row in finder.find_triangulation_groups(min_size)
+	]
+
+
+def test_overlapping_segments_without_triangulation(tmp_path):
+	# 1 overlaps 2 and 2 overlaps 3, but 1 and 3 do not overlap, so the three are never grouped
+	segments = [
+		("1", 1, 100, 200),
+		("1", 2, 150, 300),
+		("1", 3, 250, 400),
+		# the same positions on another chromosome do not make a group either
+		("2", 3, 100, 200)
+	]
+
+	assert find_groups(tmp_path, segments) == []
+	assert find_groups(tmp_path, segments, min_size=2) == [
+		("1", 150, 200, "1 2"),
+		("1", 250, 300, "2 3")
+	]
+
+
+def test_triangulated_segments_are_grouped(tmp_path):
+	segments = [
+		("1", 1, 100, 200),
+		("1", 2, 150, 300),
+		("1", 3, 180, 250),
+		# a second segment of the same person does not make the group larger
+		("1", 3, 190, 195),
+		("X", 4, 100, 200),
+		("X", 5, 200, 300),
+		("X", 6, 200, 200)
+	]
+
+	assert find_groups(tmp_path, segments) == [
+		("1", 180, 200, "1 2 3"),
+		("X", 200, 200, "4 5 6")
+	]